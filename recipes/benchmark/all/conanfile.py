@@ -2,7 +2,7 @@ from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.build import cross_building
 from conan.tools.cmake import CMake, CMakeToolchain, cmake_layout
-from conan.tools.files import collect_libs, copy, get, rmdir
+from conan.tools.files import collect_libs, copy, rmdir
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 import os
@@ -16,6 +16,7 @@ class BenchmarkConan(ConanFile):
 	homepage = "https://github.com/google/benchmark"
 	license = "Apache-2.0"
 	package_type = "library"
+	python_requires = "catapult-build-helpers/1.0@nemtech/stable"
 
 	settings = "arch", "build_type", "compiler", "os"
 	options = {
@@ -27,7 +28,8 @@ class BenchmarkConan(ConanFile):
 	default_options = {"shared": False, "fPIC": True, "enable_lto": False, "enable_exceptions": True}
 
 	def source(self):
-		get(self, **self.conan_data["sources"][self.version], strip_root=True)
+		helpers = self.python_requires["catapult-build-helpers"].module
+		helpers.get_sources(self, strip_root=True)
 
 	def config_options(self):
 		if self.settings.os == "Windows":
@@ -47,6 +49,7 @@ class BenchmarkConan(ConanFile):
 		cmake_layout(self, src_folder='src')
 
 	def generate(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		tc = CMakeToolchain(self)
 
 		tc.cache_variables["BENCHMARK_ENABLE_TESTING"] = "OFF"
@@ -69,12 +72,15 @@ class BenchmarkConan(ConanFile):
 		if "Macos" == self.settings.os:
 			tc.blocks["rpath"].skip_rpath = False
 
+		helpers.configure_compiler_cache(self, tc)
 		tc.generate()
 
 	def build(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		cmake = CMake(self)
 		cmake.configure()
 		cmake.build()
+		helpers.print_compiler_cache_stats(self)
 
 	def package(self):
 		copy(self, "LICENSE", src=self.source_folder, dst=os.path.join(self.package_folder, "licenses"))
@@ -0,0 +1,161 @@
+## Note: build helpers shared by the catapult dependency recipes through python_requires,
+## consumers call the module functions with their own conanfile
+
+from conan import ConanFile
+from conan.tools.build import build_jobs
+from conan.tools.env import Environment
+from conan.tools.files import get, save
+from conan.tools.microsoft import is_msvc
+from pathlib import Path
+import os
+
+UNITY_BUILD_EXCLUSIONS_TEMPLATE = """include_guard(GLOBAL)
+
+set(CATAPULT_UNITY_BUILD_EXCLUSIONS
+{exclusions}
+)
+
+# sources are matched once every directory is processed, so targets of subdirectories are covered too (requires cmake 3.19)
+function(catapult_skip_unity_build_inclusion directory)
+	get_property(targets DIRECTORY "${{directory}}" PROPERTY BUILDSYSTEM_TARGETS)
+	foreach(target IN LISTS targets)
+		get_property(sources TARGET "${{target}}" PROPERTY SOURCES)
+		foreach(source IN LISTS sources)
+			get_filename_component(source_path "${{source}}" ABSOLUTE BASE_DIR "${{directory}}")
+			if(source_path IN_LIST CATAPULT_UNITY_BUILD_EXCLUSIONS)
+				message(STATUS "excluding ${{source_path}} from the unity build of ${{target}}")
+				set_source_files_properties("${{source_path}}" DIRECTORY "${{directory}}" PROPERTIES SKIP_UNITY_BUILD_INCLUSION ON)
+			endif()
+		endforeach()
+	endforeach()
+
+	get_property(subdirectories DIRECTORY "${{directory}}" PROPERTY SUBDIRECTORIES)
+	foreach(subdirectory IN LISTS subdirectories)
+		catapult_skip_unity_build_inclusion("${{subdirectory}}")
+	endforeach()
+endfunction()
+
+cmake_language(DEFER DIRECTORY "${{CMAKE_SOURCE_DIR}}" CALL catapult_skip_unity_build_inclusion "${{CMAKE_SOURCE_DIR}}")
+"""
+
+
+def write_unity_build_exclusions(conanfile):
+	# translation units listed in conandata for this version do not compile inside a unity source
+	exclusions = conanfile.conan_data.get("unity_build_exclusions", {}).get(conanfile.version, [])
+	filepath = os.path.join(conanfile.generators_folder, "unity_build_exclusions.cmake")
+	save(conanfile, filepath, UNITY_BUILD_EXCLUSIONS_TEMPLATE.format(
+		exclusions="\n".join(f"\t\"${{CMAKE_SOURCE_DIR}}/{exclusion}\"" for exclusion in exclusions)))
+	return filepath.replace("\\", "/")
+
+
+def get_sources(conanfile, **kwargs):
+	# the archive in the source cache of the user.catapult:source_cache conf is tried first, the conandata urls are the fallback
+	data = dict(conanfile.conan_data["sources"][conanfile.version])
+	urls = data["url"] if isinstance(data["url"], list) else [data["url"]]
+	cache_path = conanfile.conf.get("user.catapult:source_cache")
+	if cache_path:
+		filepath = os.path.join(cache_path, "s", data["sha256"])
+		if os.path.isfile(filepath):
+			# the source cache evicts the least recently used archives first
+			os.utime(filepath)
+			data["url"] = [Path(filepath).as_uri()] + urls
+
+	# the cached archive is named after its hash, the extension of the original url tells unzip the archive format
+	get(conanfile, filename=os.path.basename(urls[0]), **data, **kwargs)
+
+
+def configure_compiler_cache(conanfile, tc):
+	# compilations go through the launcher of the user.catapult:compiler_launcher conf, e.g. ccache or sccache
+	launcher = conanfile.conf.get("user.catapult:compiler_launcher")
+	if not launcher:
+		return
+
+	tc.cache_variables["CMAKE_C_COMPILER_LAUNCHER"] = launcher
+	tc.cache_variables["CMAKE_CXX_COMPILER_LAUNCHER"] = launcher
+
+	env = Environment()
+	cache_dir = conanfile.conf.get("user.catapult:compiler_cache_dir")
+	if "sccache" in os.path.basename(launcher):
+		if cache_dir:
+			env.define_path("SCCACHE_DIR", cache_dir)
+	else:
+		if cache_dir:
+			env.define_path("CCACHE_DIR", cache_dir)
+
+		# paths relative to the build root let versions built in different conan folders share cache entries
+		env.define_path("CCACHE_BASEDIR", os.path.commonpath([conanfile.source_folder, conanfile.build_folder]))
+		env.define("CCACHE_NOHASHDIR", "true")
+		env.define_path("CCACHE_STATSLOG", os.path.join(conanfile.build_folder, "ccache-stats.log"))
+
+	env.vars(conanfile).save_script("conancompilercache")
+
+
+def print_compiler_cache_stats(conanfile):
+	launcher = conanfile.conf.get("user.catapult:compiler_launcher")
+	if not launcher:
+		return
+
+	# the ccache stats log only holds the compilations of this build, sccache reports the totals of its server
+	stats_option = "--show-stats" if "sccache" in os.path.basename(launcher) else "--show-log-stats"
+	conanfile.run(f"{launcher} {stats_option}", ignore_errors=True)
+
+
+def get_available_memory():
+	# MemAvailable of the host, lowered to the memory left below the cgroup limit inside containers
+	available_memory = None
+	try:
+		with open("/proc/meminfo", "rt", encoding="utf-8") as meminfo_file:
+			for line in meminfo_file:
+				if line.startswith("MemAvailable:"):
+					available_memory = int(line.split()[1]) * 1024
+	except OSError:
+		return None
+
+	try:
+		with open("/sys/fs/cgroup/memory.max", "rt", encoding="utf-8") as limit_file, \
+				open("/sys/fs/cgroup/memory.current", "rt", encoding="utf-8") as current_file:
+			limit = limit_file.read().strip()
+			if "max" != limit:
+				cgroup_available_memory = int(limit) - int(current_file.read())
+				available_memory = min(available_memory, cgroup_available_memory) if available_memory else cgroup_available_memory
+	except (OSError, ValueError):
+		pass
+
+	return available_memory
+
+
+def get_build_jobs(conanfile, compile_job_memory):
+	# as many jobs as cores while every job of compile_job_memory MiB fits into the available memory, an explicit tools.build:jobs wins
+	jobs = build_jobs(conanfile)
+	if conanfile.conf.get("tools.build:jobs") is not None:
+		return jobs
+
+	available_memory = get_available_memory()
+	if not available_memory:
+		return jobs
+
+	# the memory is split between the builds running concurrently on the same worker
+	concurrent_builds = conanfile.conf.get("user.catapult:concurrent_builds", default=1, check_type=int)
+	job_memory = conanfile.conf.get("user.catapult:compile_job_memory", default=compile_job_memory, check_type=int) * 1024 * 1024
+	memory_jobs = max(1, available_memory // max(1, concurrent_builds) // job_memory)
+	conanfile.output.info(f"{available_memory // (1024 * 1024)} MiB available, building with {min(jobs, memory_jobs)} of {jobs} jobs")
+	return min(jobs, memory_jobs)
+
+
+def get_build_tool_args(conanfile, compile_job_memory):
+	# like conan, -j is only passed to make and ninja, multi-config generators such as Xcode and Visual Studio do not take it,
+	# conan picks Visual Studio for msvc and Unix Makefiles elsewhere when no generator is configured
+	generator = conanfile.conf.get("tools.cmake.cmaketoolchain:generator") or ("Visual Studio" if is_msvc(conanfile) else "Unix Makefiles")
+	if "NMake" in generator or not ("Makefiles" in generator or "Ninja" in generator):
+		return []
+
+	return [f"-j{get_build_jobs(conanfile, compile_job_memory)}"]
+
+
+class CatapultBuildHelpers(ConanFile):
+	name = "catapult-build-helpers"
+	description = "Build helpers shared by the catapult dependency recipes"
+	topics = ("conan", "catapult", "python_requires")
+	url = "https://github.com/symbol/symbol-server-dependencies"
+	license = "MIT"
+	package_type = "python-require"
@@ -6,7 +6,7 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain
-from conan.tools.files import apply_conandata_patches, copy, get
+from conan.tools.files import apply_conandata_patches, copy
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 
@@ -21,6 +21,7 @@ class CppZmqConan(ConanFile):
 	license = "MIT"
 	exports_sources = "patches/*.patch"
 	package_type = "header-library"
+	python_requires = "catapult-build-helpers/1.0@nemtech/stable"
 
 	settings = "os", "compiler", "build_type", "arch"
 
@@ -28,7 +29,8 @@ class CppZmqConan(ConanFile):
 		self.requires("zeromq/4.3.5@nemtech/stable", transitive_libs=True, run=True)
 
 	def source(self):
-		get(self, **self.conan_data["sources"][self.version], strip_root=True)
+		helpers = self.python_requires["catapult-build-helpers"].module
+		helpers.get_sources(self, strip_root=True)
 
 	def config_options(self):
 		if self.settings.os == "Windows":
@@ -1,7 +1,7 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
-from conan.tools.files import copy, get
+from conan.tools.files import copy
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 import os
@@ -16,6 +16,7 @@ class MongoCDriverConan(ConanFile):
 	license = "Apache-2.0"
 	short_paths = True
 	package_type = "library"
+	python_requires = "catapult-build-helpers/1.0@nemtech/stable"
 
 	settings = "arch", "build_type", "compiler", "os"
 	options = {
@@ -33,7 +34,8 @@ class MongoCDriverConan(ConanFile):
 		cmake_layout(self, src_folder="src")
 
 	def source(self):
-		get(self, **self.conan_data["sources"][self.version], strip_root=True)
+		helpers = self.python_requires["catapult-build-helpers"].module
+		helpers.get_sources(self, strip_root=True)
 
 	def config_options(self):
 		if self.settings.os == "Windows":
@@ -47,6 +49,7 @@ class MongoCDriverConan(ConanFile):
 		self.settings.rm_safe("compiler.cppstd")
 
 	def generate(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		tc = CMakeToolchain(self)
 
 		tc.cache_variables["ENABLE_TESTS"] = "OFF"
@@ -75,14 +78,17 @@ class MongoCDriverConan(ConanFile):
 		if "Macos" == self.settings.os:
 			tc.blocks["rpath"].skip_rpath = False
 
+		helpers.configure_compiler_cache(self, tc)
 		tc.generate()
 		deps = CMakeDeps(self)
 		deps.generate()
 
 	def build(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		cmake = CMake(self)
 		cmake.configure()
 		cmake.build()
+		helpers.print_compiler_cache_stats(self)
 
 	def package(self):
 		copy(self, pattern="COPYING*", dst="licenses", src=self.source_folder)
@@ -1,11 +1,11 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
-from conan.tools.files import get
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 import os
 
+
 class MongoCxxConan(ConanFile):
 	name = "mongo-cxx-driver"
 	description = "C++ Driver for MongoDB"
@@ -14,10 +14,18 @@ class MongoCxxConan(ConanFile):
 	homepage = "https://github.com/mongodb/mongo-cxx-driver"
 	license = "Apache-2.0"
 	package_type = "library"
+	python_requires = "catapult-build-helpers/1.0@nemtech/stable"
+
+	# peak resident memory in MiB of one compiler process on the template heavy mongocxx translation units
+	_compile_job_memory = 1536
 
 	settings = "os", "compiler", "arch", "build_type"
-	options = {"shared": [True, False]}
-	default_options = {"shared": True}
+	options = {
+		"shared": [True, False],
+		"unity_build": [True, False],
+		"unity_build_batch_size": ["ANY"]
+	}
+	default_options = {"shared": True, "unity_build": False, "unity_build_batch_size": "8"}
 
 	def requirements(self):
 		self.requires("mongo-c-driver/1.25.4@nemtech/stable", transitive_libs=True, run=True)
@@ -26,7 +34,8 @@ class MongoCxxConan(ConanFile):
 		cmake_layout(self, src_folder="src")
 
 	def source(self):
-		get(self, **self.conan_data["sources"][self.version], strip_root=True)
+		helpers = self.python_requires["catapult-build-helpers"].module
+		helpers.get_sources(self, strip_root=True)
 
 	def config_options(self):
 		if self.settings.os == "Windows":
@@ -38,7 +47,17 @@ class MongoCxxConan(ConanFile):
 	def configure(self):
 		pass
 
+	def validate(self):
+		if not str(self.options.unity_build_batch_size).isdigit() or 0 == int(str(self.options.unity_build_batch_size)):
+			raise ConanInvalidConfiguration("unity_build_batch_size must be a positive number")
+
+	def package_id(self):
+		# unity builds produce the same binaries, so they share the package id of the regular build
+		self.info.options.rm_safe("unity_build")
+		self.info.options.rm_safe("unity_build_batch_size")
+
 	def generate(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		tc = CMakeToolchain(self)
 
 		tc.cache_variables["CMAKE_CXX_STANDARD"] = "17"
@@ -47,17 +66,29 @@ class MongoCxxConan(ConanFile):
 		if is_msvc(self):
 			tc.cache_variables["CMAKE_CXX_FLAGS"] = "/Zc:__cplusplus /EHsc"
 
+		if self.options.unity_build:
+			tc.cache_variables["CMAKE_UNITY_BUILD"] = True
+			tc.cache_variables["CMAKE_UNITY_BUILD_BATCH_SIZE"] = int(str(self.options.unity_build_batch_size))
+			tc.cache_variables["CMAKE_PROJECT_INCLUDE"] = helpers.write_unity_build_exclusions(self)
+
 		if "Macos" == self.settings.os:
 			tc.blocks["rpath"].skip_rpath = False
 
+		helpers.configure_compiler_cache(self, tc)
 		tc.generate()
 		deps = CMakeDeps(self)
 		deps.generate()
 
+	def build_requirements(self):
+		if "Ninja" == self.conf.get("tools.cmake.cmaketoolchain:generator"):
+			self.tool_requires("ninja/[>=1.11 <2]")
+
 	def build(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		cmake = CMake(self)
 		cmake.configure()
-		cmake.build()
+		cmake.build(build_tool_args=helpers.get_build_tool_args(self, self._compile_job_memory))
+		helpers.print_compiler_cache_stats(self)
 
 	def package(self):
 		cmake = CMake(self)
@@ -4,12 +4,14 @@
 from conan import ConanFile
 from conan.tools.build import check_min_cppstd
 from conan.tools.cmake import CMake, CMakeDeps, CMakeToolchain, cmake_layout
-from conan.tools.files import copy, collect_libs, get
+from conan.tools.files import copy, collect_libs
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
-from conan.errors import ConanInvalidConfiguration
+from conan.errors import ConanException, ConanInvalidConfiguration
 import os
 import glob
+import hashlib
+import platform
 
 
 class RocksDB(ConanFile):
@@ -20,6 +22,10 @@ class RocksDB(ConanFile):
 	url = "https://github.com/symbol/symbol-server-dependencies",
 	license = ("GPL-2.0-only", "Apache-2.0")
 	package_type = "library"
+	python_requires = "catapult-build-helpers/1.0@nemtech/stable"
+
+	# peak resident memory in MiB of one compiler process on the heaviest rocksdb translation units
+	_compile_job_memory = 1024
 
 	settings = "os", "compiler", "build_type", "arch"
 
@@ -30,11 +36,18 @@ class RocksDB(ConanFile):
 		"use_rtti": [True, False],
 		"with_gflags": [True, False],
 		"with_jemalloc": [True, False],
+		"with_liburing": [True, False],
 		"with_lz4": [True, False],
 		"with_snappy": [True, False],
 		"with_tbb": [True, False],
 		"with_zlib": [True, False],
-		"with_zstd": [True, False]
+		"with_zstd": [True, False],
+		"with_tools": [True, False],
+
+		"target_arch_level": ["portable", "x86-64-v2", "x86-64-v3", "native"],
+
+		"unity_build": [True, False],
+		"unity_build_batch_size": ["ANY"]
 	}
 	default_options = {
 		"shared": True,
@@ -43,13 +56,25 @@ class RocksDB(ConanFile):
 		"use_rtti": True,
 		"with_gflags": False,
 		"with_jemalloc": False,
+		"with_liburing": False,
 		"with_lz4": False,
 		"with_snappy": False,
 		"with_tbb": False,
 		"with_zlib": False,
-		"with_zstd": False
+		"with_zstd": False,
+		"with_tools": False,
+
+		"target_arch_level": "portable",
+
+		"unity_build": False,
+		"unity_build_batch_size": "8"
 	}
 
+	@property
+	def _with_gflags(self):
+		# db_bench only parses its command line with gflags
+		return bool(self.options.with_gflags or self.options.with_tools)
+
 	def config_options(self):
 		if self.settings.os == "Windows":
 			if is_msvc(self) and Version(self.settings.compiler.version.value) < 15:
@@ -57,6 +82,10 @@ class RocksDB(ConanFile):
 
 			del self.options.fPIC
 
+		# io_uring is a linux interface
+		if self.settings.os != "Linux":
+			del self.options.with_liburing
+
 		minimal_cpp_standard = "17"
 		if self.settings.compiler.cppstd:
 			check_min_cppstd(self, minimal_cpp_standard)
@@ -65,52 +94,138 @@ class RocksDB(ConanFile):
 		if self.settings.build_type == "Debug":
 			self.options.use_rtti = True  # Rtti are used in asserts for debug mode...
 
+	def validate(self):
+		if not str(self.options.unity_build_batch_size).isdigit() or 0 == int(str(self.options.unity_build_batch_size)):
+			raise ConanInvalidConfiguration("unity_build_batch_size must be a positive number")
+
+		target_arch_level = str(self.options.target_arch_level)
+		if target_arch_level.startswith("x86-64-"):
+			if "x86_64" != self.settings.arch:
+				raise ConanInvalidConfiguration(f"target_arch_level {target_arch_level} requires arch x86_64")
+
+			if is_msvc(self) and "x86-64-v2" == target_arch_level:
+				raise ConanInvalidConfiguration("msvc has no /arch level matching x86-64-v2, use portable or x86-64-v3")
+
+			# microarchitecture levels are accepted by -march since gcc 11 and clang 12
+			minimum_compiler_versions = {"gcc": "11", "clang": "12"}
+			compiler = str(self.settings.compiler)
+			if compiler in minimum_compiler_versions and Version(self.settings.compiler.version) < minimum_compiler_versions[compiler]:
+				raise ConanInvalidConfiguration(
+					f"target_arch_level {target_arch_level} requires {compiler} {minimum_compiler_versions[compiler]} or newer")
+
+	def package_id(self):
+		# unity builds produce the same binaries, so they share the package id of the regular build
+		self.info.options.rm_safe("unity_build")
+		self.info.options.rm_safe("unity_build_batch_size")
+
+		# a native build only runs on cpus with the features of the machine it was built on, so those features are part of the id,
+		# and the updater refuses to upload it
+		if "native" == self.info.options.target_arch_level:
+			self.info.options.target_arch_level = f"native-{self._get_cpu_features_digest()}"
+
+	@staticmethod
+	def _get_cpu_features_digest():
+		# the feature flags of the first cpu on linux, the processor description elsewhere
+		features = platform.processor() or platform.machine()
+		try:
+			with open("/proc/cpuinfo", "rt", encoding="utf-8") as cpuinfo_file:
+				for line in cpuinfo_file:
+					if line.startswith(("flags", "Features")):
+						features = " ".join(sorted(line.split(":", 1)[1].split()))
+						break
+		except OSError:
+			pass
+
+		return hashlib.sha256(features.encode("utf-8")).hexdigest()[:16]
+
 	def generate(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		tc = CMakeToolchain(self)
 
 		tc.cache_variables["FAIL_ON_WARNINGS"] = False
 		tc.cache_variables["WITH_TESTS"] = False
+		# WITH_CORE_TOOLS builds ldb and sst_dump, WITH_TOOLS would add every other tool of the tools directory
 		tc.cache_variables["WITH_TOOLS"] = False
-		tc.cache_variables["WITH_CORE_TOOLS"] = False
-		tc.cache_variables["WITH_BENCHMARK_TOOLS"] = False
+		tc.cache_variables["WITH_CORE_TOOLS"] = self.options.with_tools
+		tc.cache_variables["WITH_BENCHMARK_TOOLS"] = self.options.with_tools
 		tc.cache_variables["WITH_FOLLY_DISTRIBUTED_MUTEX"] = False
 		tc.cache_variables["WITH_MD_LIBRARY"] = is_msvc(self) and "MD" in self.settings.compiler.runtime
 		tc.cache_variables["ROCKSDB_INSTALL_ON_WINDOWS"] = self.settings.os == "Windows"
-		tc.cache_variables["WITH_GFLAGS"] = self.options.with_gflags
+		tc.cache_variables["WITH_GFLAGS"] = self._with_gflags
 		tc.cache_variables["WITH_SNAPPY"] = self.options.with_snappy
 		tc.cache_variables["WITH_LZ4"] = self.options.with_lz4
 		tc.cache_variables["WITH_ZLIB"] = self.options.with_zlib
 		tc.cache_variables["WITH_ZSTD"] = self.options.with_zstd
 		tc.cache_variables["WITH_TBB"] = self.options.with_tbb
 		tc.cache_variables["WITH_JEMALLOC"] = self.options.with_jemalloc
+		tc.cache_variables["WITH_LIBURING"] = bool(self.options.get_safe("with_liburing", False))
 		tc.cache_variables["ROCKSDB_BUILD_SHARED"] = self.options.shared
 
 		tc.cache_variables["USE_RTTI"] = self.options.use_rtti
 
-		# sse was removed https://github.com/facebook/rocksdb/pull/11419
-		tc.cache_variables["PORTABLE"] = "TRUE"
+		self._configure_target_arch_level(tc)
 		tc.cache_variables["WITH_NUMA"] = False
 
+		if self.options.unity_build:
+			tc.cache_variables["CMAKE_UNITY_BUILD"] = True
+			tc.cache_variables["CMAKE_UNITY_BUILD_BATCH_SIZE"] = int(str(self.options.unity_build_batch_size))
+			tc.cache_variables["CMAKE_PROJECT_INCLUDE"] = helpers.write_unity_build_exclusions(self)
+
 		if "Macos" == self.settings.os:
 			tc.blocks["rpath"].skip_rpath = False
 
+		helpers.configure_compiler_cache(self, tc)
 		tc.generate()
 		deps = CMakeDeps(self)
+		# rocksdb finds its dependencies with its own find modules, so the conan-center file and target names are mapped onto them
+		deps.set_property("jemalloc", "cmake_file_name", "JeMalloc")
+		deps.set_property("jemalloc", "cmake_target_name", "JeMalloc::JeMalloc")
+		deps.set_property("liburing", "cmake_file_name", "uring")
+		deps.set_property("liburing", "cmake_target_name", "uring::uring")
+		deps.set_property("lz4", "cmake_target_name", "lz4::lz4")
+		deps.set_property("onetbb", "cmake_file_name", "TBB")
+		deps.set_property("onetbb", "cmake_target_name", "TBB::TBB")
+		deps.set_property("zstd", "cmake_target_name", "zstd::zstd")
 		deps.generate()
 
 	def layout(self):
 		cmake_layout(self, src_folder="src")
 
 	def source(self):
-		get(self, **self.conan_data["sources"][self.version], strip_root=True)
+		helpers = self.python_requires["catapult-build-helpers"].module
+		helpers.get_sources(self, strip_root=True)
+
+	def _configure_target_arch_level(self, tc):
+		# since https://github.com/facebook/rocksdb/pull/11419 PORTABLE takes the -march (msvc /arch) value,
+		# TRUE builds for the baseline of the architecture and FALSE for the build machine
+		target_arch_level = str(self.options.target_arch_level)
+		if "portable" == target_arch_level:
+			tc.cache_variables["PORTABLE"] = "TRUE"
+		elif "native" == target_arch_level:
+			tc.cache_variables["PORTABLE"] = "FALSE"
+		elif is_msvc(self):
+			tc.cache_variables["PORTABLE"] = "AVX2"
+		else:
+			tc.cache_variables["PORTABLE"] = target_arch_level
+
+			# every x86-64-v3 cpu has carry-less multiplication, which the crc32c of rocksdb uses when it is enabled
+			if "x86-64-v3" == target_arch_level:
+				tc.extra_cflags.append("-mpclmul")
+				tc.extra_cxxflags.append("-mpclmul")
+
+	def build_requirements(self):
+		if "Ninja" == self.conf.get("tools.cmake.cmaketoolchain:generator"):
+			self.tool_requires("ninja/[>=1.11 <2]")
 
 	def build(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		cmake = CMake(self)
 		cmake.configure()
-		cmake.build()
+		cmake.build(build_tool_args=helpers.get_build_tool_args(self, self._compile_job_memory))
+		helpers.print_compiler_cache_stats(self)
 
 	def requirements(self):
-		if self.options.with_gflags:
+		if self._with_gflags:
 			self.requires("gflags/2.2.2")
 		if self.options.with_snappy:
 			self.requires("snappy/1.1.10")
@@ -124,6 +239,8 @@ class RocksDB(ConanFile):
 			self.requires("onetbb/2021.10.0")
 		if self.options.with_jemalloc:
 			self.requires("jemalloc/5.3.0")
+		if self.options.get_safe("with_liburing"):
+			self.requires("liburing/2.5")
 
 	def _remove_static_libraries(self):
 		for static_lib_name in ["lib*.a", "{}.lib".format(self.name)]:
@@ -136,6 +253,17 @@ class RocksDB(ConanFile):
 		cmake = CMake(self)
 		cmake.install()
 
+		# the rocksdb install target does not cover the tools, db_bench is built in the build folder and the other tools in its
+		# tools subfolder, multi-config generators put them in a subfolder named after the build type
+		if self.options.with_tools:
+			for tool, tool_folder in {"db_bench": "", "ldb": "tools", "sst_dump": "tools"}.items():
+				tool_filename = f"{tool}.exe" if self.settings.os == "Windows" else tool
+				for pattern in [tool_filename, f"{self.settings.build_type}/{tool_filename}"]:
+					copy(self, pattern, src=os.path.join(self.build_folder, tool_folder), dst=os.path.join(self.package_folder, "bin"), keep_path=False)
+
+				if not os.path.isfile(os.path.join(self.package_folder, "bin", tool_filename)):
+					raise ConanException(f"rocksdb tool {tool_filename} was not found in the build folder")
+
 	def package_info(self):
 		cmake_target = "rocksdb-shared" if self.options.shared else "rocksdb"
 		self.cpp_info.set_property("cmake_find_package", "RocksDB")
@@ -149,3 +277,9 @@ class RocksDB(ConanFile):
 				self.cpp_info.components["librocksdb"].defines = ["ROCKSDB_DLL"]
 		elif self.settings.os == "Linux":
 			self.cpp_info.components["librocksdb"].system_libs = ["pthread", "m"]
+
+		if self.options.with_tools:
+			self.cpp_info.components["tools"].bindirs = ["bin"]
+			self.cpp_info.components["tools"].libdirs = []
+			self.cpp_info.components["tools"].includedirs = []
+			self.cpp_info.components["tools"].requires = ["librocksdb"]
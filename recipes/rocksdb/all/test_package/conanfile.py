@@ -0,0 +1,132 @@
+from conan import ConanFile
+from conan.errors import ConanException
+from conan.tools.build import can_run
+from conan.tools.cmake import CMake, cmake_layout
+import glob
+import json
+import os
+import re
+import shutil
+import subprocess
+
+# instructions that only appear when the library was compiled for the selected microarchitecture level
+TARGET_ARCH_LEVEL_INSTRUCTIONS = {
+	"x86-64-v2": {"sse4.2 crc32": re.compile(r"\tcrc32[bwlq]?\s")},
+	"x86-64-v3": {"sse4.2 crc32": re.compile(r"\tcrc32[bwlq]?\s"), "avx2": re.compile(r"\tv\w+\s.*%ymm")}
+}
+
+
+class TestPackageConan(ConanFile):
+	settings = "os", "compiler", "build_type", "arch"
+	generators = "CMakeDeps", "CMakeToolchain", "VirtualRunEnv"
+	test_type = "explicit"
+
+	def layout(self):
+		cmake_layout(self)
+
+	def requirements(self):
+		self.requires(self.tested_reference_str)
+
+	def build(self):
+		cmake = CMake(self)
+		cmake.configure()
+		cmake.build()
+
+	def _get_rocksdb_library(self):
+		libraries = glob.glob(os.path.join(self.dependencies["rocksdb"].package_folder, "lib", "librocksdb.*"))
+		if not libraries:
+			raise ConanException("rocksdb library not found in the package")
+
+		return libraries[0]
+
+	def _check_instruction_set(self):
+		rocksdb = self.dependencies["rocksdb"]
+		target_arch_level = str(rocksdb.options.target_arch_level)
+		expected_instructions = TARGET_ARCH_LEVEL_INSTRUCTIONS.get(target_arch_level)
+		if not expected_instructions:
+			return
+
+		# a package built for a microarchitecture level is never accepted unchecked
+		objdump = shutil.which("objdump")
+		if not objdump:
+			raise ConanException(f"objdump (binutils) is required to check the instructions of rocksdb built for {target_arch_level}")
+
+		library = self._get_rocksdb_library()
+
+		# the disassembly is streamed and stops as soon as every expected instruction was seen
+		missing_instructions = dict(expected_instructions)
+		with subprocess.Popen([objdump, "-d", "--no-show-raw-insn", library], stdout=subprocess.PIPE, text=True) as process:
+			for line in process.stdout:
+				for name, pattern in list(missing_instructions.items()):
+					if pattern.search(line):
+						del missing_instructions[name]
+
+				if not missing_instructions:
+					process.kill()
+					break
+
+		if missing_instructions:
+			raise ConanException(f"{library} built for {target_arch_level} lacks {', '.join(missing_instructions)} instructions")
+
+		self.output.info(f"{library} uses {', '.join(expected_instructions)} instructions of {target_arch_level}")
+
+	def _check_liburing(self):
+		# rocksdb falls back to synchronous reads when find_package(uring) fails, so its symbols show whether it calls liburing
+		with_liburing = bool(self.dependencies["rocksdb"].options.get_safe("with_liburing"))
+		objdump = shutil.which("objdump")
+		if "Linux" != self.settings.os or not (with_liburing or objdump):
+			return
+
+		if not objdump:
+			raise ConanException("objdump (binutils) is required to check that rocksdb uses liburing")
+
+		library = self._get_rocksdb_library()
+		symbols = subprocess.run([objdump, "-t", "-T", library], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True).stdout
+		uses_liburing = re.search(r"\bio_uring_queue_init\b", symbols) is not None
+		if with_liburing != uses_liburing:
+			raise ConanException(f"{library} {'does not call' if with_liburing else 'calls'} liburing with with_liburing={with_liburing}")
+
+		if uses_liburing:
+			self.output.info(f"{library} submits its MultiRead block reads through io_uring")
+
+	def _check_smoke_benchmark_report(self, report_filepath):
+		# a variant that links but silently lacks a compression or jemalloc fails here instead of after upload
+		with open(report_filepath, "rt", encoding="utf-8") as report_file:
+			report = json.load(report_file)
+
+		rocksdb_options = self.dependencies["rocksdb"].options
+		expected_options = {f"compression {name}": (f"with_{name}", supported) for name, supported in report["compressions"].items()}
+		if "Linux" == self.settings.os:
+			# the nodump allocator needs MADV_DONTDUMP, so jemalloc can only be probed on linux
+			expected_options["jemalloc"] = ("with_jemalloc", report["jemalloc"])
+
+		mismatches = [
+			f"{name} is {'' if compiled_in else 'not '}compiled in with {option}={rocksdb_options.get_safe(option)}"
+			for name, (option, compiled_in) in expected_options.items()
+			if bool(rocksdb_options.get_safe(option)) != compiled_in
+		]
+		if mismatches:
+			raise ConanException(f"rocksdb options do not match the library: {'; '.join(mismatches)}")
+
+		benchmark = report["benchmark"]
+		self.output.info(
+			f"rocksdb {report['version']} smoke benchmark ({benchmark['keys']} keys, {benchmark['compression']} compression): "
+			f"bulk write {benchmark['bulk_write_ops_per_second']} ops/s, "
+			f"point read {benchmark['point_read_ops_per_second']} ops/s, "
+			f"range scan {benchmark['range_scan_ops_per_second']} ops/s")
+
+	def _check_tools(self):
+		# the tools component puts the packaged bin folder on the PATH of the run environment
+		if self.dependencies["rocksdb"].options.with_tools:
+			self.run("ldb --version", env="conanrun")
+			self.run("db_bench --version", env="conanrun")
+
+	def test(self):
+		if can_run(self):
+			bin_path = os.path.join(self.cpp.build.bindirs[0], "test_package")
+			report_filepath = os.path.join(self.build_folder, "rocksdb_smoke_benchmark.json")
+			self.run(f"\"{bin_path}\" \"{report_filepath}\"", env="conanrun")
+			self._check_smoke_benchmark_report(report_filepath)
+			self._check_instruction_set()
+			self._check_liburing()
+			self._check_tools()
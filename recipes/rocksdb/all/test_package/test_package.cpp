@@ -0,0 +1,288 @@
+#include <rocksdb/db.h>
+#include <rocksdb/memory_allocator.h>
+#include <rocksdb/version.h>
+#include <rocksdb/write_batch.h>
+#include <algorithm>
+#include <chrono>
+#include <cstdint>
+#include <cstdlib>
+#include <filesystem>
+#include <fstream>
+#include <iostream>
+#include <memory>
+#include <random>
+#include <sstream>
+#include <stdexcept>
+#include <string>
+#include <utility>
+#include <vector>
+
+namespace {
+	// bounded, so the smoke benchmark finishes in seconds on any builder
+	constexpr auto Num_Benchmark_Keys = 200'000u;
+	constexpr auto Benchmark_Batch_Size = 1'000u;
+	constexpr auto Benchmark_Value_Size = 100u;
+
+	const std::vector<std::pair<std::string, rocksdb::CompressionType>> Compression_Types{
+		{ "snappy", rocksdb::kSnappyCompression },
+		{ "lz4", rocksdb::kLZ4Compression },
+		{ "zlib", rocksdb::kZlibCompression },
+		{ "zstd", rocksdb::kZSTD }
+	};
+
+	void CheckStatus(const rocksdb::Status& status) {
+		if (!status.ok())
+			throw std::runtime_error(status.ToString());
+	}
+
+	class TemporaryDirectory {
+	public:
+		// the random suffix keeps test runs of concurrent CI jobs and variants from sharing a database
+		explicit TemporaryDirectory(const std::string& name)
+				: m_path((std::filesystem::temp_directory_path() / (name + "_" + RandomSuffix())).string()) {
+			std::filesystem::remove_all(m_path);
+		}
+
+		~TemporaryDirectory() {
+			std::filesystem::remove_all(m_path);
+		}
+
+	public:
+		const std::string& path() const {
+			return m_path;
+		}
+
+	private:
+		static std::string RandomSuffix() {
+			std::random_device randomDevice;
+			std::uniform_int_distribution<uint64_t> distribution;
+			auto suffix = distribution(randomDevice);
+
+			std::ostringstream out;
+			out << std::hex << suffix;
+			return out.str();
+		}
+
+	private:
+		std::string m_path;
+	};
+
+	std::unique_ptr<rocksdb::DB> OpenDb(const rocksdb::Options& options, const std::string& path) {
+		rocksdb::DB* pDb;
+		CheckStatus(rocksdb::DB::Open(options, path, &pDb));
+		return std::unique_ptr<rocksdb::DB>(pDb);
+	}
+
+	void CloseDb(std::unique_ptr<rocksdb::DB>& pDb) {
+		CheckStatus(pDb->Close());
+		pDb.reset();
+	}
+
+	std::string MakeKey(uint32_t index) {
+		auto key = std::to_string(index);
+		return std::string(10 - key.size(), '0') + key;
+	}
+
+	double ToOpsPerSecond(size_t numOps, std::chrono::steady_clock::time_point start) {
+		auto elapsed = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+		return numOps / std::max(elapsed, 1e-9);
+	}
+
+	// region compiled in options
+
+	bool IsCompressionSupported(rocksdb::CompressionType compressionType) {
+		// opening a database with a compression that is not linked in fails with InvalidArgument
+		TemporaryDirectory directory("rocksdb_test_package_compression");
+		rocksdb::Options options;
+		options.create_if_missing = true;
+		options.compression = compressionType;
+
+		rocksdb::DB* pDb;
+		auto status = rocksdb::DB::Open(options, directory.path(), &pDb);
+		if (!status.ok())
+			return false;
+
+		std::unique_ptr<rocksdb::DB> pDbGuard(pDb);
+		CloseDb(pDbGuard);
+		return true;
+	}
+
+	bool IsJemallocSupported() {
+		// fails when rocksdb was built without jemalloc or the platform lacks MADV_DONTDUMP
+		rocksdb::JemallocAllocatorOptions allocatorOptions;
+		std::shared_ptr<rocksdb::MemoryAllocator> pAllocator;
+		return rocksdb::NewJemallocNodumpAllocator(allocatorOptions, &pAllocator).ok();
+	}
+
+	// endregion
+
+	// region checks
+
+	void CheckPutGet(rocksdb::DB& db) {
+		CheckStatus(db.Put(rocksdb::WriteOptions(), "key", "value"));
+
+		std::string value;
+		CheckStatus(db.Get(rocksdb::ReadOptions(), "key", &value));
+		if ("value" != value)
+			throw std::runtime_error("unexpected value " + value);
+	}
+
+	void CheckMultiGet(rocksdb::DB& db) {
+		// values are flushed to a table file, so MultiGet batches their block reads through MultiRead, which is submitted
+		// through io_uring when rocksdb links liburing (ReadOptions::async_io needs coroutines, which this build does not enable)
+		std::vector<std::string> keys;
+		for (auto i = 0; i < 100; ++i) {
+			keys.push_back("multiget_key_" + std::to_string(i));
+			CheckStatus(db.Put(rocksdb::WriteOptions(), keys.back(), "value_" + std::to_string(i)));
+		}
+
+		CheckStatus(db.Flush(rocksdb::FlushOptions()));
+
+		rocksdb::ReadOptions readOptions;
+		std::vector<rocksdb::Slice> keySlices(keys.cbegin(), keys.cend());
+		std::vector<rocksdb::PinnableSlice> values(keys.size());
+		std::vector<rocksdb::Status> statuses(keys.size());
+		db.MultiGet(readOptions, db.DefaultColumnFamily(), keySlices.size(), keySlices.data(), values.data(), statuses.data());
+
+		for (auto i = 0u; i < keys.size(); ++i) {
+			CheckStatus(statuses[i]);
+			if ("value_" + std::to_string(i) != values[i].ToString())
+				throw std::runtime_error("unexpected MultiGet value for " + keys[i]);
+		}
+	}
+
+	// endregion
+
+	// region smoke benchmark
+
+	struct BenchmarkResult {
+		double BulkWriteOpsPerSecond;
+		double PointReadOpsPerSecond;
+		double RangeScanOpsPerSecond;
+	};
+
+	BenchmarkResult RunBenchmark(rocksdb::DB& db) {
+		BenchmarkResult result;
+		std::mt19937 generator(0);
+		std::string value(Benchmark_Value_Size, '\0');
+
+		auto start = std::chrono::steady_clock::now();
+		for (auto i = 0u; i < Num_Benchmark_Keys; i += Benchmark_Batch_Size) {
+			rocksdb::WriteBatch batch;
+			for (auto j = i; j < std::min(i + Benchmark_Batch_Size, Num_Benchmark_Keys); ++j) {
+				// half random bytes, half zeros, so compressed table files are smaller than the raw values
+				for (auto k = 0u; k < Benchmark_Value_Size / 2; ++k)
+					value[k] = static_cast<char>(generator());
+
+				CheckStatus(batch.Put(MakeKey(j), value));
+			}
+
+			CheckStatus(db.Write(rocksdb::WriteOptions(), &batch));
+		}
+
+		CheckStatus(db.Flush(rocksdb::FlushOptions()));
+		result.BulkWriteOpsPerSecond = ToOpsPerSecond(Num_Benchmark_Keys, start);
+
+		std::vector<uint32_t> indexes(Num_Benchmark_Keys);
+		for (auto i = 0u; i < Num_Benchmark_Keys; ++i)
+			indexes[i] = i;
+
+		std::shuffle(indexes.begin(), indexes.end(), generator);
+
+		start = std::chrono::steady_clock::now();
+		rocksdb::PinnableSlice readValue;
+		for (auto index : indexes) {
+			readValue.Reset();
+			CheckStatus(db.Get(rocksdb::ReadOptions(), db.DefaultColumnFamily(), MakeKey(index), &readValue));
+			if (Benchmark_Value_Size != readValue.size())
+				throw std::runtime_error("unexpected value size for key " + MakeKey(index));
+		}
+
+		result.PointReadOpsPerSecond = ToOpsPerSecond(Num_Benchmark_Keys, start);
+
+		start = std::chrono::steady_clock::now();
+		auto numScanned = 0u;
+		std::unique_ptr<rocksdb::Iterator> pIterator(db.NewIterator(rocksdb::ReadOptions()));
+		for (pIterator->Seek(MakeKey(0)); pIterator->Valid(); pIterator->Next())
+			++numScanned;
+
+		CheckStatus(pIterator->status());
+		if (Num_Benchmark_Keys != numScanned)
+			throw std::runtime_error("range scan returned " + std::to_string(numScanned) + " keys");
+
+		result.RangeScanOpsPerSecond = ToOpsPerSecond(numScanned, start);
+		return result;
+	}
+
+	void WriteReport(
+			const std::string& reportFilepath,
+			const std::vector<std::pair<std::string, bool>>& compressions,
+			bool isJemallocSupported,
+			const std::string& benchmarkCompression,
+			const BenchmarkResult& result) {
+		std::ofstream report(reportFilepath);
+		report << "{" << std::endl;
+		report << "\t\"version\": \"" << rocksdb::GetRocksVersionAsString() << "\"," << std::endl;
+		report << "\t\"compressions\": {";
+		for (auto i = 0u; i < compressions.size(); ++i)
+			report << (0 == i ? "" : ",") << std::endl << "\t\t\"" << compressions[i].first << "\": " << std::boolalpha << compressions[i].second;
+
+		report << std::endl << "\t}," << std::endl;
+		report << "\t\"jemalloc\": " << std::boolalpha << isJemallocSupported << "," << std::endl;
+		report << "\t\"benchmark\": {" << std::endl;
+		report << "\t\t\"keys\": " << Num_Benchmark_Keys << "," << std::endl;
+		report << "\t\t\"compression\": \"" << benchmarkCompression << "\"," << std::endl;
+		report << "\t\t\"bulk_write_ops_per_second\": " << static_cast<uint64_t>(result.BulkWriteOpsPerSecond) << "," << std::endl;
+		report << "\t\t\"point_read_ops_per_second\": " << static_cast<uint64_t>(result.PointReadOpsPerSecond) << "," << std::endl;
+		report << "\t\t\"range_scan_ops_per_second\": " << static_cast<uint64_t>(result.RangeScanOpsPerSecond) << std::endl;
+		report << "\t}" << std::endl;
+		report << "}" << std::endl;
+
+		if (!report)
+			throw std::runtime_error("could not write " + reportFilepath);
+	}
+
+	// endregion
+}
+
+int main(int argc, char** argv) try
+{
+	TemporaryDirectory directory("rocksdb_test_package");
+
+	rocksdb::Options options;
+	options.create_if_missing = true;
+
+	auto pDb = OpenDb(options, directory.path());
+	CheckPutGet(*pDb);
+	CheckMultiGet(*pDb);
+	CloseDb(pDb);
+
+	std::cout << "rocksdb " << rocksdb::GetRocksVersionAsString() << std::endl;
+	if (argc < 2)
+		return EXIT_SUCCESS;
+
+	// the benchmark uses the last compression supported by the build, zstd when it is linked in
+	std::vector<std::pair<std::string, bool>> compressions;
+	std::string benchmarkCompression = "none";
+	options.compression = rocksdb::kNoCompression;
+	for (const auto& [name, compressionType] : Compression_Types) {
+		compressions.emplace_back(name, IsCompressionSupported(compressionType));
+		if (compressions.back().second) {
+			benchmarkCompression = name;
+			options.compression = compressionType;
+		}
+	}
+
+	TemporaryDirectory benchmarkDirectory("rocksdb_test_package_benchmark");
+	pDb = OpenDb(options, benchmarkDirectory.path());
+	auto result = RunBenchmark(*pDb);
+	CloseDb(pDb);
+
+	WriteReport(argv[1], compressions, IsJemallocSupported(), benchmarkCompression, result);
+	std::cout << "smoke benchmark report written to " << argv[1] << std::endl;
+	return EXIT_SUCCESS;
+}
+catch (std::runtime_error & e) {
+	std::cerr << e.what() << std::endl;
+	return EXIT_FAILURE;
+}
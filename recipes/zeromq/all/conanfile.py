@@ -1,7 +1,7 @@
 from conan import ConanFile
 from conan.errors import ConanInvalidConfiguration
 from conan.tools.cmake import CMake, CMakeToolchain, cmake_layout
-from conan.tools.files import apply_conandata_patches, collect_libs, copy, export_conandata_patches, get, rmdir
+from conan.tools.files import apply_conandata_patches, collect_libs, copy, export_conandata_patches, rmdir
 from conan.tools.microsoft import is_msvc
 from conan.tools.scm import Version
 import os
@@ -15,6 +15,7 @@ class ZeroMQConan(ConanFile):
 	homepage = "https://github.com/zeromq/libzmq"
 	license = "LGPL-3.0"
 	package_type = "library"
+	python_requires = "catapult-build-helpers/1.0@nemtech/stable"
 
 	settings = "os", "arch", "compiler", "build_type"
 	options = {
@@ -30,7 +31,8 @@ class ZeroMQConan(ConanFile):
 		export_conandata_patches(self)
 
 	def source(self):
-		get(self, **self.conan_data["sources"][self.version], strip_root=True)
+		helpers = self.python_requires["catapult-build-helpers"].module
+		helpers.get_sources(self, strip_root=True)
 
 	def config_options(self):
 		if self.settings.os == "Windows":
@@ -48,6 +50,7 @@ class ZeroMQConan(ConanFile):
 		cmake_layout(self, src_folder="src")
 
 	def generate(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		tc = CMakeToolchain(self)
 		tc.cache_variables["ZMQ_BUILD_TESTS"] = False
 		tc.cache_variables["WITH_PERF_TOOL"] = False
@@ -61,13 +64,16 @@ class ZeroMQConan(ConanFile):
 		if "Macos" == self.settings.os:
 			tc.blocks["rpath"].skip_rpath = False
 
+		helpers.configure_compiler_cache(self, tc)
 		tc.generate()
 
 	def build(self):
+		helpers = self.python_requires["catapult-build-helpers"].module
 		apply_conandata_patches(self)
 		cmake = CMake(self)
 		cmake.configure()
 		cmake.build()
+		helpers.print_compiler_cache_stats(self)
 
 	def package(self):
 		copy(self, pattern="COPYING*", src=self.source_folder, dst="licenses")
@@ -2,101 +2,1087 @@
 
 import argparse
 import asyncio
+import datetime
+import hashlib
+import json
+import os
 import re
+import resource
+import shutil
 import subprocess
 import tempfile
+import time
 import yaml
 
-from aiohttp import ClientSession
+from aiohttp import ClientError, ClientResponseError, ClientSession, ClientTimeout, TCPConnector
+from collections import deque
+from contextlib import contextmanager, nullcontext
 from conan.tools.scm import Version
 from pathlib import Path
 
 CONAN_NEMTECH_REMOTE = 'https://conan.symbol.dev/artifactory/api/conan/catapult'
-RECIPES_REPOSITORIES = {
-	'benchmark': 'google',
-	'mongo-c-driver': 'mongodb',
-	'mongo-cxx-driver': 'mongodb',
-	'libzmq': 'zeromq',
-	'cppzmq': 'zeromq',
-	'rocksdb': 'facebook'
-}
-RECIPES = RECIPES_REPOSITORIES.keys()
-DEPENDENCY_MAP = {'mongo-cxx-driver': 'mongo-c-driver', 'cppzmq': 'zeromq'}
-REPO_RECIPE_MAP = {'libzmq': 'zeromq'}
-
-
-def dispatch_subprocess(command_line, cwd=None, handle_error=True):
-	print(' '.join(command_line))
-	result = subprocess.run(command_line, check=False, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-	if handle_error and 0 != result.returncode:
-		raise subprocess.SubprocessError(f'command failed with exit code {result.returncode}\n{result}')
-
-	decode_output = result.stdout.decode('utf-8')
-	if decode_output:
-		print(decode_output)
-
-	return decode_output, result.returncode
-
-
-def update_recipe_version(current_version, new_version, filepath):
-	dispatch_subprocess(
-		['sed', '-i', f's/{current_version}/{new_version}/g', str(filepath)],
-		handle_error=True
+GITHUB_API_URL = 'https://api.github.com'
+INDEXED_RECIPE_FILES = ('config.yml', 'all/conandata.yml', 'all/conanfile.py')
+RECIPE_INDEX_FORMAT = 2
+DOWNLOAD_TIMEOUT = 30 * 60
+DOWNLOAD_READ_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_MIN_SEGMENT_SIZE = 4 * 1024 * 1024
+DEFAULT_DOWNLOAD_SEGMENTS = 4
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_RETRY_DELAY = 1
+DOWNLOAD_PROGRESS_INTERVAL = 1
+PARTIAL_DOWNLOAD_MAX_AGE = 7 * 24 * 60 * 60
+DEFAULT_MAX_PROCESSES = 8
+DEFAULT_MAX_CONNECTIONS = 16
+GRAPHQL_BATCH_SIZE = 100
+DEFAULT_BUILD_DURATION = 10 * 60
+BUILD_HISTORY_SIZE = 5
+FINGERPRINT_IGNORED_PATHS = {'build', 'CMakeUserPresets.json', '__pycache__'}
+OUTPUT_CHUNK_SIZE = 64 * 1024
+OUTPUT_TAIL_LINES = 200
+# recipes adding the ninja tool_requires when the generator conf asks for it, the other recipes keep the default generator
+CMAKE_GENERATOR_RECIPES = ('rocksdb', 'mongo-cxx-driver')
+
+
+PROCESS_SEMAPHORE = asyncio.Semaphore(DEFAULT_MAX_PROCESSES)
+
+
+def set_max_processes(max_processes):
+	global PROCESS_SEMAPHORE
+	PROCESS_SEMAPHORE = asyncio.Semaphore(max(1, max_processes))
+
+
+def _emit_output_line(raw_line, output_tail, log_file, prefix, line_callback):
+	line = raw_line.decode('utf-8', errors='replace').rstrip('\r')
+	output_tail.append(line)
+	if log_file:
+		log_file.write(f'{line}\n')
+
+	if line_callback:
+		line_callback(line)
+
+	print(f'{prefix}{line}')
+
+
+async def _stream_output(stream, output_tail, log_file, prefix, line_callback):
+	# read fixed size chunks instead of readline so a single huge line cannot grow the buffer
+	pending = b''
+	while True:
+		chunk = await stream.read(OUTPUT_CHUNK_SIZE)
+		if not chunk:
+			break
+
+		lines = (pending + chunk).split(b'\n')
+		pending = lines.pop()
+		if len(pending) >= OUTPUT_CHUNK_SIZE:
+			lines.append(pending)
+			pending = b''
+
+		for line in lines:
+			_emit_output_line(line, output_tail, log_file, prefix, line_callback)
+
+	if pending:
+		_emit_output_line(pending, output_tail, log_file, prefix, line_callback)
+
+
+async def dispatch_subprocess(
+	command_line,
+	cwd=None,
+	handle_error=True,
+	timeout=None,
+	log_filepath=None,
+	capture_stdout=False,
+	line_callback=None
+):
+	# with capture_stdout, stdout is returned in full (for machine readable output) and only stderr is streamed
+	output_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+	captured_stdout = None
+	prefix = f'[{Path(log_filepath).parent.name}:{Path(log_filepath).stem}] ' if log_filepath else ''
+	async with PROCESS_SEMAPHORE:
+		print(' '.join(command_line))
+		if log_filepath:
+			Path(log_filepath).parent.mkdir(parents=True, exist_ok=True)
+
+		with open(log_filepath, 'at', encoding='utf-8') if log_filepath else nullcontext() as log_file:
+			process = await asyncio.create_subprocess_exec(
+				*command_line,
+				cwd=cwd,
+				stdout=subprocess.PIPE,
+				stderr=subprocess.PIPE if capture_stdout else subprocess.STDOUT)
+			try:
+				if capture_stdout:
+					captured_stdout, *_ = await asyncio.wait_for(asyncio.gather(
+						process.stdout.read(),
+						_stream_output(process.stderr, output_tail, log_file, prefix, line_callback),
+						process.wait()), timeout)
+				else:
+					await asyncio.wait_for(asyncio.gather(_stream_output(process.stdout, output_tail, log_file, prefix, line_callback), process.wait()), timeout)
+			except asyncio.TimeoutError as error:
+				raise subprocess.TimeoutExpired(command_line, timeout) from error
+			finally:
+				# kill the child when timed out or when the awaiting task was cancelled
+				if process.returncode is None:
+					process.kill()
+					await process.wait()
+
+	output = '\n'.join(output_tail)
+	if handle_error and 0 != process.returncode:
+		log_message = f' (full log in {log_filepath})' if log_filepath else ''
+		raise subprocess.SubprocessError(
+			f'command failed with exit code {process.returncode}{log_message}\n{command_line}\n'
+			f'last {len(output_tail)} lines of output:\n{output}')
+
+	if capture_stdout:
+		return captured_stdout.decode('utf-8'), process.returncode
+
+	# only the last OUTPUT_TAIL_LINES lines are retained, memory does not grow with the command output
+	return output, process.returncode
+
+
+def write_json_file(filepath, data):
+	filepath.parent.mkdir(parents=True, exist_ok=True)
+	temporary_filepath = filepath.with_name(f'{filepath.name}.tmp')
+	with open(temporary_filepath, 'wt', encoding='utf-8') as output_file:
+		json.dump(data, output_file, indent=2)
+
+	os.replace(temporary_filepath, filepath)
+
+
+async def gather_or_cancel(*awaitables):
+	tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+	try:
+		return await asyncio.gather(*tasks)
+	except BaseException:
+		# the first failure cancels all sibling tasks
+		for task in tasks:
+			task.cancel()
+
+		await asyncio.gather(*tasks, return_exceptions=True)
+		raise
+
+
+def _version_pattern(version):
+	# anchored so that neither 1.25.4 matches 11.25.40 nor the dots match arbitrary characters
+	return rf'(?<![\d.]){re.escape(version)}(?!\.?\d)'
+
+
+class RecipeFileRewriter:
+	def __init__(self):
+		self.edits = {}
+
+	def _add_edit(self, filepath, edit):
+		self.edits.setdefault(Path(filepath), []).append(edit)
+
+	@staticmethod
+	def _replace_yaml_keys(text, current_version, new_version):
+		return re.sub(
+			rf'^(\s*)(["\']?){re.escape(current_version)}\2(\s*:)',
+			lambda match: f'{match.group(1)}{match.group(2)}{new_version}{match.group(2)}{match.group(3)}',
+			text,
+			flags=re.MULTILINE)
+
+	@staticmethod
+	def _replace_source_urls(text, current_version, new_version):
+		return re.sub(
+			r'^(\s*-?\s*url:.*)$',
+			lambda match: re.sub(_version_pattern(current_version), new_version, match.group(1)),
+			text,
+			flags=re.MULTILINE)
+
+	@staticmethod
+	def _replace_find_package_version(text, current_version, new_version):
+		return re.sub(
+			rf'(find_package\(\s*[\w:-]+\s+){re.escape(current_version)}(?=[\s)])',
+			lambda match: f'{match.group(1)}{new_version}',
+			text)
+
+	def update_version(self, filepath, current_version, new_version):
+		filepath = Path(filepath)
+		if 'config.yml' == filepath.name:
+			self._add_edit(filepath, lambda text: self._replace_yaml_keys(text, current_version, new_version))
+		elif 'conandata.yml' == filepath.name:
+			self._add_edit(filepath, lambda text: self._replace_yaml_keys(text, current_version, new_version))
+			self._add_edit(filepath, lambda text: self._replace_source_urls(text, current_version, new_version))
+		elif 'CMakeLists.txt' == filepath.name:
+			self._add_edit(filepath, lambda text: self._replace_find_package_version(text, current_version, new_version))
+		else:
+			raise ValueError(f'unsupported recipe file {filepath}')
+
+	def update_source_sha256(self, filepath, version, sha256):
+		def edit(text):
+			lines = text.split('\n')
+			in_sources = False
+			source_version = None
+			for index, line in enumerate(lines):
+				if line and not line[0].isspace():
+					in_sources = line.startswith('sources:')
+					source_version = None
+					continue
+
+				key_match = re.match(r'^  (["\']?)([^\s"\':]+)\1:\s*$', line)
+				if in_sources and key_match:
+					source_version = key_match.group(2)
+				elif in_sources and version == source_version:
+					lines[index] = re.sub(r'^(\s*sha256:\s*).*$', lambda match: f'{match.group(1)}{sha256}', line)
+
+			return '\n'.join(lines)
+
+		self._add_edit(filepath, edit)
+
+	def update_requirement(self, filepath, requirement, current_version, new_version):
+		self._add_edit(filepath, lambda text: re.sub(
+			rf'((?:self\.requires\(\s*|python_requires\s*=\s*)["\']{re.escape(requirement)}/){re.escape(current_version)}(?=[@"\'])',
+			lambda match: f'{match.group(1)}{new_version}',
+			text))
+
+	def apply(self):
+		# every file is read once, all of its edits are applied and it is atomically replaced
+		rewritten_filepaths = []
+		for filepath, edits in self.edits.items():
+			text = filepath.read_text(encoding='utf-8')
+			updated_text = text
+			for edit in edits:
+				updated_text = edit(updated_text)
+
+			if updated_text == text:
+				continue
+
+			print(f'rewriting {filepath}')
+			with tempfile.NamedTemporaryFile('wt', encoding='utf-8', dir=filepath.parent, delete=False) as temporary_file:
+				temporary_file.write(updated_text)
+
+			shutil.copymode(filepath, temporary_file.name)
+			os.replace(temporary_file.name, filepath)
+			rewritten_filepaths.append(filepath)
+
+		self.edits = {}
+		return rewritten_filepaths
+
+
+async def initialize_conan(remote_url=CONAN_NEMTECH_REMOTE):
+	await dispatch_subprocess(['conan', 'profile', 'detect', '--name=default', '--force'])
+	await dispatch_subprocess(['conan', 'remote', 'add', '--force', 'nemtech', remote_url])
+
+
+class RecipeRegistry:
+	# index of the recipes found in the recipes path, upstream repository, versions and requirements are parsed once,
+	# a cached entry is reused while the mtime and size of its files are unchanged, or while their content hash matches
+	def __init__(self, recipes_path, index_filepath=None):
+		self.recipes_path = Path(recipes_path).absolute()
+		self.index_filepath = Path(index_filepath).absolute() if index_filepath else None
+		self.entries = {}
+		self._load()
+
+	def _get_file_signatures(self, recipe):
+		signatures = {}
+		for relative_path in INDEXED_RECIPE_FILES:
+			filepath = self.recipes_path / recipe / relative_path
+			if filepath.exists():
+				file_stat = filepath.stat()
+				signatures[relative_path] = [file_stat.st_mtime_ns, file_stat.st_size]
+
+		return signatures
+
+	def _get_content_hash(self, recipe):
+		sha256 = hashlib.sha256()
+		for relative_path in INDEXED_RECIPE_FILES:
+			filepath = self.recipes_path / recipe / relative_path
+			if filepath.exists():
+				sha256.update(f'{relative_path}\0'.encode('utf-8'))
+				sha256.update(filepath.read_bytes())
+
+		return sha256.hexdigest()
+
+	@staticmethod
+	def _parse_repository(url):
+		# github archive urls are https://github.com/<owner>/<repo>/archive/...
+		match = re.match(r'https?://[^/]+/([^/]+)/([^/]+)/archive/', url or '')
+		return [match.group(1), match.group(2)] if match else None
+
+	def _parse_recipe(self, recipe, signatures):
+		recipe_path = self.recipes_path / recipe
+		with open(recipe_path / 'config.yml', 'rt', encoding='utf-8') as config_file:
+			versions = [str(version) for version in yaml.safe_load(config_file)['versions'].keys()]
+
+		sources = {}
+		conandata_filepath = recipe_path / 'all/conandata.yml'
+		if conandata_filepath.exists():
+			with open(conandata_filepath, 'rt', encoding='utf-8') as conandata_file:
+				for version, source in (yaml.safe_load(conandata_file).get('sources') or {}).items():
+					url = source['url']
+					sources[str(version)] = url if isinstance(url, str) else url[0]
+
+		requires = {}
+		package_type = None
+		conanfile_filepath = recipe_path / 'all/conanfile.py'
+		if conanfile_filepath.exists():
+			conanfile_text = conanfile_filepath.read_text()
+			# python_requires are dependencies too, their recipes must be exported before the consumers
+			requires = dict(re.findall(r'(?:self\.requires\(\s*|python_requires\s*=\s*)[\'"]([^/\'"]+)/([^@\'"]+)', conanfile_text))
+			package_type_match = re.search(r'package_type\s*=\s*[\'"]([^\'"]+)', conanfile_text)
+			package_type = package_type_match.group(1) if package_type_match else None
+
+		return {
+			'signatures': signatures,
+			'content_hash': self._get_content_hash(recipe),
+			'versions': versions,
+			'repository': self._parse_repository(sources.get(versions[0])),
+			'sources': sources,
+			'requires': requires,
+			'package_type': package_type
+		}
+
+	def _load(self):
+		cached_entries = {}
+		if self.index_filepath and self.index_filepath.exists():
+			with open(self.index_filepath, 'rt', encoding='utf-8') as index_file:
+				index = json.load(index_file)
+
+			if RECIPE_INDEX_FORMAT == index.get('format'):
+				cached_entries = index['recipes']
+
+		is_changed = False
+		for config_filepath in sorted(self.recipes_path.glob('*/config.yml')):
+			recipe = config_filepath.parent.name
+			signatures = self._get_file_signatures(recipe)
+			entry = cached_entries.get(recipe)
+			if entry and entry['signatures'] != signatures:
+				# touched files, e.g. after a checkout, keep their entry when the content did not change
+				entry = {**entry, 'signatures': signatures} if entry['content_hash'] == self._get_content_hash(recipe) else None
+				is_changed = True
+
+			if not entry:
+				entry = self._parse_recipe(recipe, signatures)
+				is_changed = True
+
+			self.entries[recipe] = entry
+
+		if self.index_filepath and (is_changed or cached_entries.keys() != self.entries.keys()):
+			write_json_file(self.index_filepath, {'format': RECIPE_INDEX_FORMAT, 'recipes': self.entries})
+
+	@property
+	def recipes(self):
+		return list(self.entries.keys())
+
+	def get_current_version(self, recipe):
+		return self.entries[recipe]['versions'][0]
+
+	def get_repository(self, recipe):
+		# (owner, repo) of the upstream github repository, None when the sources are not hosted on github
+		repository = self.entries[recipe]['repository']
+		return tuple(repository) if repository else None
+
+	def get_source_url(self, recipe, version):
+		return self.entries[recipe]['sources'][version]
+
+	def get_dependencies(self, recipe):
+		# only recipes maintained in this repository are built locally
+		return {
+			dependency: version for dependency, version in self.entries[recipe]['requires'].items()
+			if dependency in self.entries and dependency != recipe
+		}
+
+	def get_python_requires(self):
+		return [recipe for recipe, entry in self.entries.items() if 'python-require' == entry['package_type']]
+
+	def get_dependents(self, recipe):
+		return [dependent for dependent in self.entries if recipe in self.get_dependencies(dependent)]
+
+	def get_dependency_graph(self, recipes):
+		return {recipe: set(self.get_dependencies(recipe).keys()) for recipe in recipes}
+
+	def update_recipe_dependent_version(self, recipes_versions, rewriter):
+		for recipe, (current_version, new_version) in recipes_versions.items():
+			for dependent in self.get_dependents(recipe):
+				print(f'updating dependent {dependent} requirement {recipe} {current_version} -> {new_version}')
+				rewriter.update_requirement(self.recipes_path / f'{dependent}/all/conanfile.py', recipe, current_version, new_version)
+
+
+class RunReport:
+	def __init__(self):
+		self.start_time = time.time()
+		self.start_counter = time.perf_counter()
+		self.stages = []
+		self.bytes_transferred = {}
+
+	def record(self, stage, recipe, start_counter, duration):
+		self.stages.append({
+			'recipe': recipe,
+			'stage': stage,
+			'start': round(start_counter - self.start_counter, 3),
+			'duration': round(duration, 3)
+		})
+
+	@contextmanager
+	def measure(self, stage, recipe=None):
+		start_counter = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.record(stage, recipe, start_counter, time.perf_counter() - start_counter)
+
+	def add_bytes_transferred(self, recipe, byte_count):
+		key = recipe or 'run'
+		self.bytes_transferred[key] = self.bytes_transferred.get(key, 0) + byte_count
+
+	def to_json(self):
+		recipes = {}
+		for stage in self.stages:
+			recipe_stages = recipes.setdefault(stage['recipe'] or 'run', {})
+			recipe_stages[stage['stage']] = round(recipe_stages.get(stage['stage'], 0) + stage['duration'], 3)
+
+		# ru_maxrss is reported in KiB on linux, for children it is the peak of the largest child
+		return {
+			'start_time': self.start_time,
+			'duration': round(time.perf_counter() - self.start_counter, 3),
+			'peak_rss_kib': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+			'peak_child_rss_kib': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+			'bytes_transferred': self.bytes_transferred,
+			'recipes': recipes,
+			'stages': self.stages
+		}
+
+	def write(self, filepath):
+		write_json_file(Path(filepath).absolute(), self.to_json())
+		print(f'run report written to {filepath}')
+
+
+class ConanPhaseTracker:
+	# splits a conan create into the phases conan announces in its output, the markers are anchored to the created reference,
+	# so dependencies built by --build=missing do not count as phases of the recipe
+	PHASE_MARKERS = (
+		(r'Calling source\(\)', 'create.source'),
+		(r'Running CMake\.configure\(\)', 'create.configure'),
+		(r'Running CMake\.build\(\)', 'create.build'),
+		(r'Calling package\(\)', 'create.package'),
+		(r"Package '[0-9a-f]+' created", None)
 	)
 
+	def __init__(self, report, recipe, reference):
+		self.report = report
+		self.recipe = recipe
+		self.phase_markers = [(re.compile(rf'^{re.escape(reference)}: {marker}'), phase) for marker, phase in self.PHASE_MARKERS]
+		self.phase = None
+		self.phase_start_counter = None
+
+	def __call__(self, line):
+		for pattern, phase in self.phase_markers:
+			if pattern.search(line):
+				self.close()
+				self.phase = phase
+				self.phase_start_counter = time.perf_counter()
+				break
+
+	def close(self):
+		if self.phase:
+			self.report.record(self.phase, self.recipe, self.phase_start_counter, time.perf_counter() - self.phase_start_counter)
+			self.phase = None
+
+
+class BuildHistory:
+	def __init__(self, filepath):
+		self.filepath = Path(filepath).absolute() if filepath else None
+		self.durations = {}
+		if self.filepath and self.filepath.exists():
+			with open(self.filepath, 'rt', encoding='utf-8') as history_file:
+				self.durations = json.load(history_file)
+
+	def estimate(self, recipe):
+		# median of the most recent builds, recipes never built are assumed to take as long as an average recipe
+		recipe_durations = sorted(self.durations.get(recipe, []))
+		if recipe_durations:
+			return recipe_durations[len(recipe_durations) // 2]
+
+		all_durations = [duration for durations in self.durations.values() for duration in durations]
+		return sum(all_durations) / len(all_durations) if all_durations else DEFAULT_BUILD_DURATION
+
+	def record(self, recipe, duration):
+		self.durations[recipe] = (self.durations.get(recipe, []) + [round(duration, 3)])[-BUILD_HISTORY_SIZE:]
+		if self.filepath:
+			write_json_file(self.filepath, self.durations)
+
+
+class BuildScheduler:
+	def __init__(self, dependency_graph, max_jobs, durations=None):
+		self.dependency_graph = dependency_graph
+		self.max_jobs = max(1, max_jobs)
+		self.durations = durations or {}
+		self.unfinished_builds = set()
+
+	def get_concurrent_builds(self):
+		# upper bound of the builds running next to each other from now on, so the last builds of a run get the whole worker
+		return max(1, min(self.max_jobs, len(self.unfinished_builds)))
+
+	def _get_priorities(self, recipes):
+		# longest remaining path from the start of a recipe build to the end of the run
+		dependents = {recipe: [dependent for dependent in recipes if recipe in self.dependency_graph.get(dependent, ())] for recipe in recipes}
+		priorities = {}
+
+		def compute_priority(recipe, visiting):
+			if recipe in visiting:
+				raise RuntimeError(f'dependency cycle detected at recipe {recipe}')
+
+			if recipe not in priorities:
+				longest_dependent_path = max((compute_priority(dependent, visiting | {recipe}) for dependent in dependents[recipe]), default=0)
+				priorities[recipe] = self.durations.get(recipe, 0) + longest_dependent_path
+
+			return priorities[recipe]
+
+		for recipe in recipes:
+			compute_priority(recipe, frozenset())
+
+		return priorities
+
+	def _order_by_critical_path(self, recipes):
+		recipes = list(recipes)
+		priorities = self._get_priorities(recipes)
+		return sorted(recipes, key=lambda recipe: -priorities[recipe])
+
+	def plan(self, recipes):
+		# simulates the scheduling policy of run() with the estimated durations, returns the makespan and the schedule
+		recipes = self._order_by_critical_path(recipes)
+		pending = {recipe: set(self.dependency_graph.get(recipe, ())) & set(recipes) for recipe in recipes}
+		running = []
+		schedule = []
+		current_time = 0
+		while running or pending:
+			ready = [recipe for recipe in recipes if recipe in pending and not pending[recipe]]
+			for recipe in ready[:self.max_jobs - len(running)]:
+				del pending[recipe]
+				end_time = current_time + self.durations.get(recipe, 0)
+				running.append((end_time, recipe))
+				schedule.append((recipe, current_time, end_time))
 
-def initialize_conan():
-	dispatch_subprocess(['conan', 'profile', 'detect', '--name=default', '--force'])
-	dispatch_subprocess(['conan', 'remote', 'add', '--force', 'nemtech', CONAN_NEMTECH_REMOTE])
+			if not running:
+				raise RuntimeError(f'dependency cycle detected between recipes {sorted(pending)}')
 
+			current_time = min(end_time for end_time, _ in running)
+			for end_time, recipe in [build for build in running if build[0] == current_time]:
+				running.remove((end_time, recipe))
+				for dependencies in pending.values():
+					dependencies.discard(recipe)
 
-class RecipeHelper:
-	def __init__(self, dependency_map, repo_recipe_map):
-		self.dependency_map = dependency_map
-		self.repo_recipe_map = repo_recipe_map
+		return current_time, schedule
+
+	async def run(self, recipes, action, prerequisites=None):
+		# a recipe starts once its prerequisite (if any) and the builds of its dependencies completed,
+		# ready recipes on the longest remaining critical path are started first
+		recipes = self._order_by_critical_path(recipes)
+		pending = {recipe: set(self.dependency_graph.get(recipe, ())) & set(recipes) for recipe in recipes}
+		self.unfinished_builds = set(recipes)
+		preparing = {asyncio.ensure_future(awaitable): recipe for recipe, awaitable in (prerequisites or {}).items() if recipe in pending}
+		unprepared = set(preparing.values())
+		running = {}
+		try:
+			while running or pending:
+				# start every prepared recipe whose dependencies are built, up to the job budget
+				ready = [recipe for recipe in recipes if recipe in pending and not pending[recipe] and recipe not in unprepared]
+				for recipe in ready[:self.max_jobs - len(running)]:
+					del pending[recipe]
+					print(f'scheduling build of {recipe}')
+					running[asyncio.ensure_future(action(recipe))] = recipe
+
+				if not running and not preparing:
+					raise RuntimeError(f'dependency cycle detected between recipes {sorted(pending)}')
+
+				done, _ = await asyncio.wait([*running.keys(), *preparing.keys()], return_when=asyncio.FIRST_COMPLETED)
+				for task in done:
+					if task in preparing:
+						task.result()
+						unprepared.discard(preparing.pop(task))
+						continue
+
+					recipe = running.pop(task)
+					self.unfinished_builds.discard(recipe)
+					if task.exception():
+						print(f'build of {recipe} failed')
+						raise task.exception()
+
+					for dependencies in pending.values():
+						dependencies.discard(recipe)
+		finally:
+			# a failure cancels the builds still in flight
+			for task in [*running.keys(), *preparing.keys()]:
+				task.cancel()
+
+			await asyncio.gather(*running.keys(), *preparing.keys(), return_exceptions=True)
+
+
+class HttpClient:
+	# one pooled session for the whole run, json lookups are revalidated with conditional requests,
+	# api_headers (the github token) are only sent with the json api requests, never with archive downloads
+	def __init__(self, cache_filepath=None, max_connections=DEFAULT_MAX_CONNECTIONS, api_headers=None, report=None):
+		self.cache_filepath = Path(cache_filepath).absolute() if cache_filepath else None
+		self.max_connections = max_connections
+		self.api_headers = api_headers or {}
+		self.response_cache = {}
+		self.session = None
+		self.report = report
+
+	async def __aenter__(self):
+		if self.cache_filepath and self.cache_filepath.exists():
+			with open(self.cache_filepath, 'rt', encoding='utf-8') as cache_file:
+				self.response_cache = json.load(cache_file)
+
+		self.session = ClientSession(raise_for_status=True, connector=TCPConnector(limit=self.max_connections))
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.session.close()
+		if self.cache_filepath:
+			write_json_file(self.cache_filepath, self.response_cache)
+
+	async def get_json(self, url):
+		headers = dict(self.api_headers)
+		cached_response = self.response_cache.get(url)
+		if cached_response:
+			if cached_response.get('etag'):
+				headers['If-None-Match'] = cached_response['etag']
+			if cached_response.get('last_modified'):
+				headers['If-Modified-Since'] = cached_response['last_modified']
+
+		async with self.session.get(url, headers=headers) as response:
+			if 304 == response.status and cached_response:
+				print(f'{url} not modified')
+				return cached_response['body']
+
+			body_bytes = await response.read()
+			if self.report:
+				self.report.add_bytes_transferred(None, len(body_bytes))
+			body = json.loads(body_bytes)
+			if response.headers.get('ETag') or response.headers.get('Last-Modified'):
+				self.response_cache[url] = {
+					'etag': response.headers.get('ETag'),
+					'last_modified': response.headers.get('Last-Modified'),
+					'body': body
+				}
+
+			return body
+
+	async def post_json(self, url, payload):
+		async with self.session.post(url, json=payload, headers=self.api_headers) as response:
+			body_bytes = await response.read()
+			if self.report:
+				self.report.add_bytes_transferred(None, len(body_bytes))
+			return json.loads(body_bytes)
+
+	def head(self, url):
+		return self.session.head(url, allow_redirects=True)
+
+	def stream(self, url, headers=None):
+		# a stalled connection fails after the read timeout, so the download can be resumed on a new connection
+		return self.session.get(url, headers=headers, timeout=ClientTimeout(total=DOWNLOAD_TIMEOUT, sock_read=DOWNLOAD_READ_TIMEOUT))
+
+
+class StreamHash:
+	# sha256 of an archive arriving as a single in-order stream, restarted when the download starts over
+	def __init__(self):
+		self.reset()
+
+	def reset(self):
+		self.sha256 = hashlib.sha256()
+		self.duration = 0
+
+	def update(self, chunk):
+		start_counter = time.perf_counter()
+		self.sha256.update(chunk)
+		self.duration += time.perf_counter() - start_counter
+
+
+class DownloadManager:
+	# fetches archives in parallel byte ranges when the server accepts them and resumes interrupted transfers from the
+	# last byte received, the progress is saved next to the partial file so a later run continues the same download,
+	# concurrent connections are capped by the pool of the http client
+	def __init__(self, http_client, max_segments=DEFAULT_DOWNLOAD_SEGMENTS):
+		self.http_client = http_client
+		self.max_segments = max(1, max_segments)
+
+	async def _probe(self, url):
+		# returns the size, whether byte ranges are accepted and a validator identifying the archive content
+		try:
+			async with self.http_client.head(url) as response:
+				accepts_ranges = 'bytes' == response.headers.get('Accept-Ranges') and response.content_length is not None
+				validator = response.headers.get('ETag') or response.headers.get('Last-Modified')
+				return response.content_length, accepts_ranges, validator
+		except ClientResponseError:
+			# servers rejecting HEAD requests are downloaded in a single stream
+			return None, False, None
+
+	def _split(self, size, accepts_ranges):
+		if not accepts_ranges:
+			return [[0, size, 0]]
+
+		segment_count = max(1, min(self.max_segments, size // DOWNLOAD_MIN_SEGMENT_SIZE))
+		boundaries = [size * index // segment_count for index in range(segment_count + 1)]
+		return [[start, end, 0] for start, end in zip(boundaries, boundaries[1:])]
+
+	@staticmethod
+	def _load_progress(progress_filepath, archive_filepath, url, size, validator):
+		if not progress_filepath or not progress_filepath.exists() or not archive_filepath.exists():
+			return None
+
+		with open(progress_filepath, 'rt', encoding='utf-8') as progress_file:
+			progress = json.load(progress_file)
+
+		# a changed archive can not be resumed
+		if [url, size, validator] != [progress['url'], progress['size'], progress['validator']] or not validator:
+			return None
+
+		return progress['segments']
+
+	@staticmethod
+	def _hash_file(filepath):
+		sha256 = hashlib.sha256()
+		with open(filepath, 'rb') as input_file:
+			for chunk in iter(lambda: input_file.read(DOWNLOAD_CHUNK_SIZE), b''):
+				sha256.update(chunk)
 
-	def update_recipe_dependent_version(self, recipes_versions, recipe_path):
-		for recipe, recipe_dependent in self.dependency_map.items():
-			versions = recipes_versions.get(recipe_dependent)
-			print(f'checking dependent version {recipe}, {recipe_dependent} {versions}')
-			if versions:
-				current_version, new_version = versions
-				update_recipe_version(current_version, new_version, recipe_path / f'{recipe}/all/conanfile.py')
+		return sha256.hexdigest()
 
-	def get_recipe_name(self, repo_name):
-		return self.repo_recipe_map.get(repo_name, repo_name)
+	async def _download_segment(self, url, archive_file, segment, accepts_ranges, save_progress, recipe, stream_hash=None):
+		report = self.http_client.report
+		for attempt in range(DOWNLOAD_RETRIES + 1):
+			start, end, received = segment
+			if not accepts_ranges and received:
+				print(f'{url} does not accept byte ranges, restarting download')
+				segment[2] = received = 0
+				if archive_file:
+					archive_file.truncate(0)
+				if stream_hash:
+					stream_hash.reset()
+
+			headers = {}
+			if accepts_ranges:
+				headers['Range'] = f'bytes={start + received}-{end - 1}'
+
+			try:
+				async with self.http_client.stream(url, headers) as response:
+					if accepts_ranges and 206 != response.status:
+						raise RuntimeError(f'{url} ignored the requested byte range')
+
+					async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+						if stream_hash:
+							stream_hash.update(chunk)
+						if archive_file:
+							archive_file.seek(start + segment[2])
+							archive_file.write(chunk)
+
+						segment[2] += len(chunk)
+						if report:
+							report.add_bytes_transferred(recipe, len(chunk))
+
+						save_progress()
+
+				if end is not None and end - start != segment[2]:
+					raise ClientError(f'{url} segment {start}-{end} ended after {segment[2]} bytes')
+
+				return
+			except (ClientError, asyncio.TimeoutError) as error:
+				if isinstance(error, ClientResponseError) and error.status < 500 or DOWNLOAD_RETRIES == attempt:
+					raise
+
+				delay = DOWNLOAD_RETRY_DELAY * 2 ** attempt
+				print(f'{url} download interrupted at byte {start + segment[2]} ({error}), resuming in {delay}s')
+				save_progress(force=True)
+				await asyncio.sleep(delay)
+
+	async def download(self, url, archive_filepath=None, progress_filepath=None, recipe=None):
+		# returns the sha256 of the archive, which is also written to archive_filepath when given,
+		# a single in-order stream is hashed while its chunks arrive and only needs a file when one was requested,
+		# archives fetched in several byte ranges or resumed from an earlier run are hashed from the file afterwards
+		start_counter = time.perf_counter()
+		size, accepts_ranges, validator = await self._probe(url)
+		segments = self._load_progress(progress_filepath, archive_filepath, url, size, validator) if archive_filepath else None
+		is_resumed = bool(segments)
+		if is_resumed:
+			received = sum(segment[2] for segment in segments)
+			print(f'resuming download of {url} after {received} bytes')
+		else:
+			segments = self._split(size, accepts_ranges)
+
+		stream_hash = StreamHash() if not is_resumed and 1 == len(segments) else None
+		is_temporary = not archive_filepath and not stream_hash
+		if is_temporary:
+			file_descriptor, temporary_filepath = tempfile.mkstemp(suffix='.part')
+			os.close(file_descriptor)
+			archive_filepath = Path(temporary_filepath)
+		elif archive_filepath and not is_resumed:
+			archive_filepath.parent.mkdir(parents=True, exist_ok=True)
+			archive_filepath.write_bytes(b'')
+
+		last_save_time = time.monotonic()
+
+		def save_progress(force=False):
+			nonlocal last_save_time
+			if not progress_filepath or not validator or not (force or time.monotonic() - last_save_time > DOWNLOAD_PROGRESS_INTERVAL):
+				return
+
+			# data is flushed first, the recorded progress never covers bytes missing from the partial file
+			archive_file.flush()
+			write_json_file(progress_filepath, {'url': url, 'size': size, 'validator': validator, 'segments': segments})
+			last_save_time = time.monotonic()
+
+		report = self.http_client.report
+		try:
+			with open(archive_filepath, 'r+b') if archive_filepath else nullcontext() as archive_file:
+				try:
+					await gather_or_cancel(*[
+						self._download_segment(url, archive_file, segment, accepts_ranges, save_progress, recipe, stream_hash)
+						for segment in segments if segment[1] is None or segment[1] - segment[0] != segment[2]
+					])
+				except BaseException:
+					save_progress(force=True)
+					raise
+
+			if progress_filepath:
+				progress_filepath.unlink(missing_ok=True)
+
+			if stream_hash:
+				# hashing overlapped the download, its share is the time spent inside sha256.update
+				if report:
+					report.record('hash', recipe, start_counter, stream_hash.duration)
+
+				return stream_hash.sha256.hexdigest()
+
+			# segments arrive out of order, the archive is hashed after the download in a worker thread
+			hash_start_counter = time.perf_counter()
+			sha256 = await asyncio.to_thread(self._hash_file, archive_filepath)
+			if report:
+				report.record('hash', recipe, hash_start_counter, time.perf_counter() - hash_start_counter)
+
+			return sha256
+		finally:
+			if is_temporary:
+				archive_filepath.unlink(missing_ok=True)
+
+
+class SourceArchiveCache:
+	# uses the conan download cache layout (<cache>/s/<sha256>), recipes unpack the archives through the
+	# `get_sources()` build helper when the `user.catapult:source_cache` conf of the command names the same directory
+	def __init__(self, cache_path, max_size):
+		self.cache_path = Path(cache_path).absolute()
+		self.max_size = max_size
+
+	@property
+	def conan_conf(self):
+		return f'user.catapult:source_cache={self.cache_path}'
+
+	def get_filepath(self, sha256):
+		return self.cache_path / 's' / sha256
+
+	def get_partial_filepath(self, url):
+		# partial downloads are named after their url, so an interrupted download is found again by the next run
+		return self.cache_path / 'tmp' / f'{hashlib.sha256(url.encode("utf-8")).hexdigest()}.part'
+
+	def store(self, temporary_filepath, sha256):
+		filepath = self.get_filepath(sha256)
+		filepath.parent.mkdir(parents=True, exist_ok=True)
+		os.replace(temporary_filepath, filepath)
+		print(f'cached source archive {filepath}')
+
+	def _get_archives(self):
+		sources_path = self.cache_path / 's'
+		if not sources_path.exists():
+			return []
+
+		return [filepath for filepath in sources_path.iterdir() if re.fullmatch(r'[0-9a-f]{64}', filepath.name)]
+
+	def evict(self):
+		# least recently used archives are removed first, the build helpers touch an archive they unpack
+		archives = sorted(
+			((filepath, filepath.stat()) for filepath in self._get_archives()),
+			key=lambda archive: max(archive[1].st_atime, archive[1].st_mtime))
+		total_size = sum(stat.st_size for _, stat in archives)
+		for filepath, stat in archives:
+			if total_size <= self.max_size:
+				break
+
+			print(f'evicting source archive {filepath}')
+			for related_filepath in (filepath, filepath.with_name(f'{filepath.name}.json')):
+				related_filepath.unlink(missing_ok=True)
+
+			total_size -= stat.st_size
+
+		# partial downloads nobody resumed for a long time are abandoned
+		temporary_path = self.cache_path / 'tmp'
+		if temporary_path.exists():
+			for filepath in temporary_path.iterdir():
+				if time.time() - filepath.stat().st_mtime > PARTIAL_DOWNLOAD_MAX_AGE:
+					print(f'removing abandoned partial download {filepath}')
+					filepath.unlink(missing_ok=True)
+
+
+class BuildStateManifest:
+	def __init__(self, filepath):
+		self.filepath = Path(filepath).absolute()
+		self.entries = {}
+		if self.filepath.exists():
+			with open(self.filepath, 'rt', encoding='utf-8') as manifest_file:
+				self.entries = json.load(manifest_file)
+
+	def is_completed(self, fingerprint, stage):
+		return self.entries.get(fingerprint, {}).get(stage, False)
+
+	def mark_completed(self, fingerprint, reference, stage):
+		self.entries.setdefault(fingerprint, {'reference': reference})[stage] = True
+		write_json_file(self.filepath, self.entries)
+
+
+class RunCheckpoint:
+	# completed steps of the current run, a resumed run continues from the first incomplete step
+	def __init__(self, filepath, resume=False):
+		self.filepath = Path(filepath).absolute()
+		self.state = {'discovery': None, 'hashes': {}, 'rewritten': {}, 'committed': False, 'create': [], 'test': [], 'upload': []}
+		if resume and self.filepath.exists():
+			with open(self.filepath, 'rt', encoding='utf-8') as checkpoint_file:
+				self.state.update(json.load(checkpoint_file))
+
+		self._write()
+
+	def _write(self):
+		write_json_file(self.filepath, self.state)
+
+	@property
+	def discovery(self):
+		discovery = self.state['discovery']
+		return None if discovery is None else {recipe: tuple(versions) for recipe, versions in discovery.items()}
+
+	def record_discovery(self, recipes_versions):
+		self.state['discovery'] = {recipe: list(versions) for recipe, versions in recipes_versions.items()}
+		self._write()
+
+	def get_sha256(self, url):
+		return self.state['hashes'].get(url)
+
+	def record_sha256(self, url, sha256):
+		self.state['hashes'][url] = sha256
+		self._write()
+
+	def get_rewritten_filepaths(self, recipe):
+		filepaths = self.state['rewritten'].get(recipe)
+		return None if filepaths is None else [Path(filepath) for filepath in filepaths]
+
+	def record_rewritten_filepaths(self, recipe, filepaths):
+		self.state['rewritten'][recipe] = [str(filepath) for filepath in filepaths]
+		self._write()
+
+	@property
+	def is_committed(self):
+		return self.state['committed']
+
+	def record_commit(self):
+		self.state['committed'] = True
+		self._write()
+
+	def is_completed(self, stage, reference):
+		return reference in self.state[stage]
+
+	def mark_completed(self, stage, reference):
+		self.state[stage].append(reference)
+		self._write()
+
+	def finish(self):
+		# a completed run leaves nothing to resume
+		self.filepath.unlink(missing_ok=True)
 
 
 class CatapultRecipesUpdater:
-	def __init__(self, source_path, recipe_helper):
+	def __init__(
+		self,
+		source_path,
+		registry,
+		http_client,
+		max_jobs=1,
+		command_timeout=None,
+		logs_path=None,
+		source_cache=None,
+		github_api_url=GITHUB_API_URL,
+		discovery='rest',
+		build_state=None,
+		skip_published=False,
+		report=None,
+		build_history=None,
+		checkpoint=None,
+		download_manager=None,
+		conan_conf=None
+	):
 		self.source_path = Path(source_path).absolute()
-		self.recipe_helper = recipe_helper
+		self.registry = registry
+		self.http_client = http_client
+		self.github_api_url = github_api_url.rstrip('/')
+		self.discovery = discovery
+		self.max_jobs = max_jobs
+		self.command_timeout = command_timeout
+		self.logs_path = Path(logs_path).absolute() if logs_path else None
+		self.source_cache = source_cache
+		self.build_state = build_state
+		self.fingerprints = {}
+		self.scheduler = None
+		self.skip_published = skip_published
+		self.shared_results = {}
+		self.report = report or RunReport()
+		self.build_history = build_history or BuildHistory(None)
+		self.checkpoint = checkpoint
+		self.download_manager = download_manager or DownloadManager(http_client)
+		self.conan_conf = conan_conf or []
 
-	@staticmethod
-	async def _get_recipe_latest_version(owner, repo):
-		url = f'https://api.github.com/repos/{owner}/{repo}/releases/latest'
-		async with ClientSession(raise_for_status=True) as session:
-			async with session.get(url) as response:
-				response_json = await response.json()
-				if 200 != response.status:
-					raise Exception(f'failed to get latest release for {owner}/{repo} {response_json}')
-				return re.sub(r'[^\d\.]', '', response_json['tag_name'])
+	def _get_log_filepath(self, recipe, phase):
+		return self.logs_path / recipe / f'{phase}.log' if self.logs_path else None
 
 	@staticmethod
-	async def _read_yaml_file(filepath):
-		with open(filepath, 'rt') as file:
-			return yaml.safe_load(file)
-
-	async def _get_current_version(self, name):
-		recipe_config_filepath = self.source_path / f'{name}/config.yml'
-		config = await self._read_yaml_file(recipe_config_filepath)
-		return next(iter(config['versions'].keys()))
-
-	async def _get_update_if_available(self, recipe_repo):
-		owner = RECIPES_REPOSITORIES[recipe_repo]
-		latest_version = await self._get_recipe_latest_version(owner, recipe_repo)
-		recipe = self.recipe_helper.get_recipe_name(recipe_repo)
-		current_version = await self._get_current_version(recipe)
+	def _parse_release_version(tag_name):
+		return re.sub(r'[^\d\.]', '', tag_name)
+
+	async def _get_recipe_latest_version(self, owner, repo):
+		url = f'{self.github_api_url}/repos/{owner}/{repo}/releases/latest'
+		response_json = await self.http_client.get_json(url)
+		return self._parse_release_version(response_json['tag_name'])
+
+	async def _get_latest_versions_graphql(self, recipes):
+		# one aliased repository field per tracked repository, all resolved by a single request
+		fields = []
+		for index, recipe in enumerate(recipes):
+			owner, repo = self.registry.get_repository(recipe)
+			fields.append(f'r{index}: repository(owner: {json.dumps(owner)}, name: {json.dumps(repo)}) {{ latestRelease {{ tagName }} }}')
+
+		query = '\n'.join(['query {'] + fields + ['}'])
+		response_json = await self.http_client.post_json(f'{self.github_api_url}/graphql', {'query': query})
+		if response_json.get('errors'):
+			raise RuntimeError(f'failed to get latest releases {response_json["errors"]}')
+
+		latest_versions = {}
+		for index, recipe in enumerate(recipes):
+			repository = response_json['data'][f'r{index}']
+			if not repository or not repository['latestRelease']:
+				raise RuntimeError(f'failed to get latest release for {"/".join(self.registry.get_repository(recipe))}')
+
+			latest_versions[recipe] = self._parse_release_version(repository['latestRelease']['tagName'])
+
+		return latest_versions
+
+	async def _get_latest_versions(self, recipes):
+		with self.report.measure('release_lookup'):
+			return await self._lookup_latest_versions(recipes)
+
+	async def _measure_recipe_latest_version(self, recipe):
+		with self.report.measure('release_lookup', recipe):
+			return await self._get_recipe_latest_version(*self.registry.get_repository(recipe))
+
+	async def _lookup_latest_versions(self, recipes):
+		if 'graphql' == self.discovery:
+			batches = [recipes[index:index + GRAPHQL_BATCH_SIZE] for index in range(0, len(recipes), GRAPHQL_BATCH_SIZE)]
+			latest_versions = {}
+			for batch_versions in await gather_or_cancel(*[self._get_latest_versions_graphql(batch) for batch in batches]):
+				latest_versions.update(batch_versions)
+
+			return latest_versions
+
+		latest_versions = await gather_or_cancel(*[self._measure_recipe_latest_version(recipe) for recipe in recipes])
+		return dict(zip(recipes, latest_versions))
+
+	def _get_update_if_available(self, recipe, latest_version):
+		current_version = self.registry.get_current_version(recipe)
 		print(f'checking recipe {recipe} {current_version} -> {latest_version}')
 		if Version(latest_version) > Version(current_version):
 			print(f'{recipe} has new version: {latest_version}')
@@ -105,21 +1091,48 @@ class CatapultRecipesUpdater:
 		return None
 
 	async def get_available_updates(self, recipes):
-		results = await asyncio.gather(*[self._get_update_if_available(recipe) for recipe in recipes])
+		tracked_recipes = []
+		for recipe in recipes:
+			if self.registry.get_repository(recipe):
+				tracked_recipes.append(recipe)
+			else:
+				print(f'skipping recipe {recipe}, its sources are not hosted on github')
+
+		latest_versions = await self._get_latest_versions(tracked_recipes)
+		results = [self._get_update_if_available(recipe, latest_versions[recipe]) for recipe in tracked_recipes]
 		return {result[0]: (result[1], result[2]) for result in results if result}
 
-	async def _update_conandata_sha(self, recipe, filepath, version):
-		config = await self._read_yaml_file(filepath)
-		url = config['sources'][version]['url']
-		with tempfile.TemporaryDirectory() as tmpdir:
-			tmp_source_filepath = f'{tmpdir}/{recipe}.{version}.tar.gz'
-			dispatch_subprocess(['curl', '-LJ', url, '--output', tmp_source_filepath])
-			output, _ = dispatch_subprocess(['sha256sum', tmp_source_filepath], handle_error=True)
-			config['sources'][version]['sha256'] = output.split(' ')[0]
-			with open(filepath, 'w') as output_file:
-				yaml.dump(config, output_file, sort_keys=False)
-
-	async def _update_recipe_files(self, recipe, versions):
+	async def _download_sha256(self, url, recipe=None):
+		# with a source cache the archive is written to a partial file whose progress survives a failed run, so the next
+		# run resumes the download, the complete archive is moved into the cache,
+		# without a cache a single stream download is only hashed and never touches the disk
+		archive_filepath = progress_filepath = None
+		if self.source_cache:
+			archive_filepath = self.source_cache.get_partial_filepath(url)
+			progress_filepath = archive_filepath.with_name(f'{archive_filepath.name}.json')
+
+		with self.report.measure('download', recipe):
+			sha256 = await self.download_manager.download(url, archive_filepath, progress_filepath, recipe)
+
+		if self.source_cache:
+			self.source_cache.store(archive_filepath, sha256)
+
+		return sha256
+
+	async def _get_source_sha256(self, recipe, versions):
+		current_version, new_version = versions
+		url = re.sub(_version_pattern(current_version), new_version, self.registry.get_source_url(recipe, current_version))
+		if self.checkpoint and self.checkpoint.get_sha256(url):
+			return self.checkpoint.get_sha256(url)
+
+		print(f'hashing {recipe} source archive {url}')
+		sha256 = await self._download_sha256(url, recipe)
+		if self.checkpoint:
+			self.checkpoint.record_sha256(url, sha256)
+
+		return sha256
+
+	async def _update_recipe_files(self, recipe, versions, rewriter):
 		update_recipe_files_descriptor = [
 			r'{recipe}/config.yml',
 			r'{recipe}/all/conandata.yml',
@@ -127,77 +1140,493 @@ class CatapultRecipesUpdater:
 		]
 
 		print(f'updating recipe {recipe} {versions}')
+		current_version, new_version = versions
 		for recipe_file_descriptor in update_recipe_files_descriptor:
 			recipe_file = recipe_file_descriptor.format(recipe=recipe)
 			recipe_filepath = self.source_path / recipe_file
 			if recipe_filepath.exists():
-				current_version, new_version = versions
-				update_recipe_version(current_version, new_version, recipe_filepath)
+				rewriter.update_version(recipe_filepath, current_version, new_version)
 				if 'conandata.yml' == recipe_filepath.name:
-					await self._update_conandata_sha(recipe, recipe_filepath, new_version)
+					sha256 = await self._get_source_sha256(recipe, versions)
+					rewriter.update_source_sha256(recipe_filepath, new_version, sha256)
+
+	async def update_recipe_version(self, recipe, versions):
+		# rewrites the recipe files and the requirements of its dependents, returns the rewritten files
+		if self.checkpoint and self.checkpoint.get_rewritten_filepaths(recipe) is not None:
+			print(f'skipping update of {recipe}, files were already rewritten')
+			return self.checkpoint.get_rewritten_filepaths(recipe)
+
+		rewriter = RecipeFileRewriter()
+		await self._update_recipe_files(recipe, versions, rewriter)
+		self.registry.update_recipe_dependent_version({recipe: versions}, rewriter)
+		with self.report.measure('rewrite', recipe):
+			rewritten_filepaths = rewriter.apply()
+
+		if self.checkpoint:
+			self.checkpoint.record_rewritten_filepaths(recipe, rewritten_filepaths)
+
+		return rewritten_filepaths
+
+	def _get_conan_conf_arguments(self):
+		return [argument for conf in self.conan_conf for argument in ('-c', conf)]
+
+	def _hash_recipe_tree(self, sha256, recipe):
+		recipe_path = self.source_path / recipe
+		for filepath in sorted(recipe_path.rglob('*')):
+			relative_path = filepath.relative_to(recipe_path)
+			# skip build trees and presets left behind by conan create and test_package
+			if not filepath.is_file() or FINGERPRINT_IGNORED_PATHS.intersection(relative_path.parts) or '.pyc' == filepath.suffix:
+				continue
+
+			sha256.update(f'{relative_path.as_posix()}\0'.encode('utf-8'))
+			sha256.update(filepath.read_bytes())
+			sha256.update(b'\0')
+
+	def _get_shared_result(self, name, create_coroutine):
+		# runs a query needed by several recipes only once per run
+		if name not in self.shared_results:
+			self.shared_results[name] = asyncio.ensure_future(create_coroutine())
+
+		return self.shared_results[name]
+
+	async def _get_profile_description(self):
+		output, _ = await dispatch_subprocess(['conan', 'profile', 'show'])
+		return output
+
+	async def _get_locked_references(self, recipe, versions, variant_profile=None):
+		# every reference, with its recipe revision, the graph of the recipe resolves to, so a new version or revision of an
+		# external dependency, e.g. within the zlib/[>=1.2.11 <2] range, changes the fingerprint
+		reference = self._get_reference(recipe, versions)
+		with self.report.measure('graph', recipe):
+			output, _ = await dispatch_subprocess(
+				[
+					'conan', 'graph', 'info', '.', f'--name={recipe}', f'--version={versions[1]}', '--user=nemtech', '--channel=stable',
+					'--remote=nemtech', '--format=json'
+				] + self._get_variant_profile_arguments(variant_profile),
+				cwd=self.source_path / f'{recipe}/all',
+				timeout=self.command_timeout,
+				log_filepath=self._get_log_filepath(recipe, self._get_variant_phase('lock', variant_profile)),
+				capture_stdout=True)
+
+		return sorted(
+			node['ref'] for node in json.loads(output)['graph']['nodes'].values()
+			if node['ref'] and node['ref'].split('#')[0] != reference)
+
+	async def _compute_fingerprint(self, recipe, recipes_versions):
+		# a recipe fingerprint covers its files, the resolved versions, the profile, the locked graph of every variant
+		# and the fingerprints of its dependencies
+		if recipe in self.fingerprints:
+			return self.fingerprints[recipe]
+
+		profile_description = await self._get_shared_result('profile', self._get_profile_description)
+		dependency_graph = self.registry.get_dependency_graph(self.registry.recipes)
+		# the locked graph of the recipe covers the external dependencies of its dependencies as well
+		locked_references = await gather_or_cancel(*[
+			self._get_locked_references(recipe, recipes_versions[recipe], variant_profile) for variant_profile in self._get_variants(recipe)
+		])
+
+		def compute_fingerprint(recipe, visiting, locked_references=()):
+			if recipe in self.fingerprints:
+				return self.fingerprints[recipe]
+
+			if recipe in visiting:
+				raise RuntimeError(f'dependency cycle detected at recipe {recipe}')
+
+			sha256 = hashlib.sha256()
+			sha256.update(f'{recipe}\0{recipes_versions.get(recipe, ("", ""))[1]}\0'.encode('utf-8'))
+			self._hash_recipe_tree(sha256, recipe)
+			sha256.update(profile_description.encode('utf-8'))
+			for variant_references in locked_references:
+				sha256.update('\0'.join(variant_references).encode('utf-8') + b'\0')
+
+			# the source cache location and the confs of the build environment, e.g. compiler cache and parallelism,
+			# do not change the package, so they are left out and moving a cache keeps the recorded fingerprints
+			for dependency in sorted(dependency_graph.get(recipe, ())):
+				sha256.update(compute_fingerprint(dependency, visiting | {recipe}).encode('utf-8'))
+
+			self.fingerprints[recipe] = sha256.hexdigest()
+			return self.fingerprints[recipe]
+
+		return compute_fingerprint(recipe, frozenset(), locked_references)
+
+	@staticmethod
+	def _get_reference(recipe, versions):
+		return f'{recipe}/{versions[1]}@nemtech/stable'
+
+	def _get_variants(self, recipe):
+		# every profile next to a recipe describes a variant built, tested and uploaded with the default package (None)
+		profiles_path = self.source_path / f'{recipe}/all/profiles'
+		return [None] + (sorted(filepath for filepath in profiles_path.iterdir() if filepath.is_file()) if profiles_path.is_dir() else [])
+
+	@staticmethod
+	def _get_variant_phase(phase, variant_profile):
+		return f'{phase}-{variant_profile.name}' if variant_profile else phase
+
+	@staticmethod
+	def _get_variant_profile_arguments(variant_profile):
+		# variant profiles only hold options, so they are composed on top of the default profile
+		return ['--profile:host=default', f'--profile:host={variant_profile}'] if variant_profile else []
+
+	async def _get_published_packages(self):
+		# a single query lists every revision and package id published under nemtech/stable
+		with self.report.measure('list'):
+			output, _ = await dispatch_subprocess(
+				['conan', 'list', '*/*@nemtech/stable#*:*', '--remote=nemtech', '--format=json'],
+				timeout=self.command_timeout,
+				capture_stdout=True)
+		published_packages = set()
+		remote_description = json.loads(output).get('nemtech', {})
+		if 'error' in remote_description:
+			# conan still exits with 0 when the remote is unreachable or rejects the credentials
+			print(f'unable to list the packages published on nemtech, every package will be built\n{remote_description["error"]}')
+			return published_packages
+
+		for reference, recipe_description in remote_description.items():
+			for recipe_revision, revision_description in recipe_description.get('revisions', {}).items():
+				for package_id in revision_description.get('packages', {}):
+					published_packages.add((reference, recipe_revision, package_id))
+
+		return published_packages
+
+	async def _export_recipe(self, recipe, versions):
+		with self.report.measure('export', recipe):
+			await dispatch_subprocess(
+				['conan', 'export', '.', f'--name={recipe}', f'--version={versions[1]}', '--user=nemtech', '--channel=stable'],
+				cwd=self.source_path / f'{recipe}/all',
+				log_filepath=self._get_log_filepath(recipe, 'export'))
 
-	async def update_recipes_version(self, recipes_versions):
-		print(f'updating recipes {recipes_versions}')
-		await asyncio.gather(*[
-			self._update_recipe_files(recipe, versions) for recipe, versions in recipes_versions.items()
+	async def export_python_requires(self, upload=False):
+		# recipes load their python_requires as soon as they are exported, so the shared build helpers are exported
+		# before any build and uploaded before any package, consumers of the remote need them to load the recipes
+		for recipe in self.registry.get_python_requires():
+			version = self.registry.get_current_version(recipe)
+			await self._export_recipe(recipe, (version, version))
+			if upload:
+				await dispatch_subprocess(
+					['conan', 'upload', self._get_reference(recipe, (version, version)), '--remote=nemtech', '--force'],
+					timeout=self.command_timeout,
+					log_filepath=self._get_log_filepath(recipe, 'upload'))
+
+	async def _get_package_identity(self, recipe, versions, variant_profile=None):
+		# the exported recipe revision is resolved from the local cache, the package id is computed for the current profile
+		reference = self._get_reference(recipe, versions)
+		try:
+			with self.report.measure('graph', recipe):
+				output, _ = await dispatch_subprocess(
+					['conan', 'graph', 'info', f'--requires={reference}', '--remote=nemtech', '--format=json']
+					+ self._get_variant_profile_arguments(variant_profile)
+					+ self._get_conan_conf_arguments(),
+					timeout=self.command_timeout,
+					log_filepath=self._get_log_filepath(recipe, self._get_variant_phase('graph', variant_profile)),
+					capture_stdout=True)
+		except subprocess.SubprocessError as error:
+			print(f'unable to compute package id of {reference}, it will be built\n{error}')
+			return None
+
+		for node in json.loads(output)['graph']['nodes'].values():
+			if node['ref'] and node['ref'].split('#')[0] == reference:
+				return reference, node['rrev'], node['package_id']
+
+		return None
+
+	async def _is_published(self, recipe, versions):
+		# dependencies were built or found published before, so the graph of the exported recipe resolves
+		# the recipe only counts as published when the packages of all its variants are
+		await self._export_recipe(recipe, versions)
+		published_packages, *package_identities = await gather_or_cancel(
+			self._get_shared_result('published', self._get_published_packages),
+			*[self._get_package_identity(recipe, versions, variant_profile) for variant_profile in self._get_variants(recipe)])
+		if all(package_identity in published_packages for package_identity in package_identities):
+			print(f'{recipe} packages {package_identities} are already published on nemtech')
+			return True
+
+		return False
+
+	async def _execute_conan_package_command(self, recipe, versions, phase, command, cwd=None, variant_profile=None):
+		# returns False when the phase already completed in the resumed run
+		reference = self._get_reference(recipe, versions)
+		step = f'{reference} ({variant_profile.name})' if variant_profile else reference
+		if self.checkpoint and self.checkpoint.is_completed(phase, step):
+			print(f'skipping {phase} of {step}, it already completed in the resumed run')
+			return False
+
+		phase_tracker = ConanPhaseTracker(self.report, recipe, reference)
+		try:
+			with self.report.measure(phase, recipe):
+				await dispatch_subprocess(
+					command + self._get_variant_profile_arguments(variant_profile),
+					cwd=cwd or self.source_path / f'{recipe}/all',
+					handle_error=True,
+					timeout=self.command_timeout,
+					log_filepath=self._get_log_filepath(recipe, self._get_variant_phase(phase, variant_profile)),
+					line_callback=phase_tracker
+				)
+		finally:
+			phase_tracker.close()
+
+		if self.build_state:
+			self.build_state.mark_completed(self.fingerprints[recipe], reference, self._get_variant_phase(phase, variant_profile))
+
+		if self.checkpoint:
+			self.checkpoint.mark_completed(phase, step)
+
+		return True
+
+	async def build_recipe(self, recipe, versions, recipes_versions):
+		# returns False when the package does not need to be built nor uploaded
+		if self.build_state:
+			fingerprint = await self._compute_fingerprint(recipe, recipes_versions)
+			stages = [self._get_variant_phase('create', variant_profile) for variant_profile in self._get_variants(recipe)] + ['upload']
+			if all(self.build_state.is_completed(fingerprint, stage) for stage in stages):
+				print(f'skipping build of {recipe}, fingerprint {fingerprint} was already built and uploaded')
+				return False
+
+		if self.skip_published and await self._is_published(recipe, versions):
+			print(f'skipping build of {recipe}, package is already published')
+			return False
+
+		# test_package runs as its own stage, so dependents can start as soon as the packages are created
+		start_counter = time.perf_counter()
+		created = False
+		for variant_profile in self._get_variants(recipe):
+			# recipes sizing their build jobs by the available memory share it with the builds that can run next to them
+			concurrent_builds = self.scheduler.get_concurrent_builds() if self.scheduler else 1
+			created |= await self._execute_conan_package_command(recipe, versions, 'create', [
+				'conan', 'create', '.', f'--name={recipe}', f'--version={versions[1]}', '--user=nemtech', '--channel=stable',
+				'--build=missing', '--remote=nemtech', '--test-folder='
+			] + self._get_conan_conf_arguments() + ['-c', f'user.catapult:concurrent_builds={concurrent_builds}'], variant_profile=variant_profile)
+
+		if created:
+			self.build_history.record(recipe, time.perf_counter() - start_counter)
+
+		return True
+
+	async def test_recipe(self, recipe, versions):
+		if not (self.source_path / f'{recipe}/all/test_package').exists():
+			return
+
+		for variant_profile in self._get_variants(recipe):
+			await self._execute_conan_package_command(recipe, versions, 'test', [
+				'conan', 'test', 'test_package', self._get_reference(recipe, versions), '--remote=nemtech'
+			] + self._get_conan_conf_arguments(), variant_profile=variant_profile)
+
+	async def upload_recipe(self, recipe, versions):
+		if self.build_state and self.build_state.is_completed(self.fingerprints[recipe], 'upload'):
+			print(f'skipping upload of {recipe}, fingerprint {self.fingerprints[recipe]} was already uploaded')
+			return
+
+		# the reference pattern covers the binaries of every variant created in the local cache
+		await self._check_uploadable_packages(recipe, versions)
+		await self._execute_conan_package_command(recipe, versions, 'upload', [
+			'conan', 'upload', self._get_reference(recipe, versions), '--remote=nemtech', '--force'
 		])
 
-		self.recipe_helper.update_recipe_dependent_version(recipes_versions, self.source_path)
+	async def _check_uploadable_packages(self, recipe, versions):
+		# binaries built for the cpu of the build machine (target_arch_level=native) only run on that machine
+		reference = self._get_reference(recipe, versions)
+		with self.report.measure('list', recipe):
+			output, _ = await dispatch_subprocess(
+				['conan', 'list', f'{reference}#*:*', '--format=json'],
+				timeout=self.command_timeout,
+				capture_stdout=True)
+		for recipe_description in json.loads(output).get('Local Cache', {}).values():
+			for revision_description in recipe_description.get('revisions', {}).values():
+				for package_id, package_description in revision_description.get('packages', {}).items():
+					target_arch_level = package_description.get('info', {}).get('options', {}).get('target_arch_level', '')
+					if target_arch_level.startswith('native'):
+						raise RuntimeError(f'refusing to upload {reference}:{package_id}, it is built for the cpu of the build machine')
+
+	async def _commit_updates(self, recipe_updates, commit_message):
+		rewritten_filepaths = [filepath for recipe_filepaths in await gather_or_cancel(*recipe_updates) for filepath in recipe_filepaths]
+		if self.source_cache:
+			self.source_cache.evict()
+
+		if commit_message and not (self.checkpoint and self.checkpoint.is_committed):
+			# only the rewritten files are staged, build trees created meanwhile stay out of the commit
+			await dispatch_subprocess(['git', 'add', '--'] + [str(filepath) for filepath in rewritten_filepaths], cwd=self.source_path)
+			await dispatch_subprocess(['git', 'commit', '-m', commit_message], cwd=self.source_path)
+			if self.checkpoint:
+				self.checkpoint.record_commit()
+
+	def _create_scheduler(self, recipes_versions):
+		dependency_graph = self.registry.get_dependency_graph(recipes_versions.keys())
+		durations = {recipe: self.build_history.estimate(recipe) for recipe in recipes_versions}
+		return BuildScheduler(dependency_graph, self.max_jobs, durations)
+
+	def print_build_plan(self, recipes_versions):
+		makespan, schedule = self._create_scheduler(recipes_versions).plan(recipes_versions.keys())
+		print(f'build plan with {self.max_jobs} jobs:')
+		for recipe, start_time, end_time in sorted(schedule, key=lambda build: build[1]):
+			print(f'  {datetime.timedelta(seconds=round(start_time))} - {datetime.timedelta(seconds=round(end_time))} {recipe}')
+
+		print(f'predicted makespan: {datetime.timedelta(seconds=round(makespan))}')
+		return makespan
+
+	async def process_updates(self, recipes_versions, upload=False, commit_message=None):
+		# every recipe moves through update -> build -> test -> upload as soon as its own inputs are ready,
+		# only the builds are bound by the job budget and wait for the builds of their dependencies
+		recipe_updates = {
+			recipe: asyncio.ensure_future(self.update_recipe_version(recipe, versions))
+			for recipe, versions in recipes_versions.items()
+		}
+		follow_ups = []
+		# resolves with the first failed test or upload, so the run is cancelled without waiting for the remaining builds
+		follow_up_failure = asyncio.get_running_loop().create_future()
 
-	async def _execute_conan_package_command(self, recipes_versions, get_command):
-		for recipe, versions in recipes_versions.items():
-			_, new_version = versions
-			recipe_path = self.source_path / f'{recipe}/all'
-			dispatch_subprocess(
-				get_command(new_version, recipe),
-				cwd=recipe_path,
-				handle_error=True
-			)
+		def watch_follow_up(task):
+			if not task.cancelled() and task.exception() and not follow_up_failure.done():
+				follow_up_failure.set_exception(task.exception())
 
-	async def build_conan_package(self, recipes_versions):
-		await self._execute_conan_package_command(
-			recipes_versions,
-			lambda version, recipe_name: ['conan', 'create', '.', f'--name={recipe_name}', f'--version={version}', '--user=nemtech', '--channel=stable', '--build=missing', '--remote=nemtech']
-		)
+		async def build_stage(recipe):
+			versions = recipes_versions[recipe]
+			if await self.build_recipe(recipe, versions, recipes_versions):
+				follow_up = asyncio.ensure_future(self._test_and_upload(recipe, versions, upload))
+				follow_up.add_done_callback(watch_follow_up)
+				follow_ups.append(follow_up)
 
-	async def upload_conan_package(self, recipes_versions):
-		await self._execute_conan_package_command(
-			recipes_versions,
-			lambda version, recipe_name: ['conan', 'upload', f'{recipe_name}/{version}@nemtech/stable', '--remote=nemtech', '--force']
-		)
+		async def build_and_follow_up():
+			await self.scheduler.run(recipes_versions.keys(), build_stage, recipe_updates)
+			await asyncio.gather(*follow_ups)
+			if not follow_up_failure.done():
+				follow_up_failure.set_result(None)
+
+		self.scheduler = self._create_scheduler(recipes_versions)
+		try:
+			await self.export_python_requires(upload)
+			await gather_or_cancel(
+				self._commit_updates(recipe_updates.values(), commit_message),
+				build_and_follow_up(),
+				follow_up_failure)
+		finally:
+			for task in [*recipe_updates.values(), *follow_ups]:
+				task.cancel()
+
+			await asyncio.gather(*recipe_updates.values(), *follow_ups, return_exceptions=True)
+
+	async def _test_and_upload(self, recipe, versions, upload):
+		await self.test_recipe(recipe, versions)
+		if upload:
+			await self.upload_recipe(recipe, versions)
 
 
 async def main():
 	parser = argparse.ArgumentParser(description='Recipes updater for catapult')
 	parser.add_argument('--commit-title', help='commit title')
-	parser.add_argument('--recipes', choices=RECIPES, help='recipes to update', default=RECIPES)
+	parser.add_argument('--recipes', help='recipes to update, all recipes of the recipes path by default', nargs='+')
 	parser.add_argument('--recipes-path', help='path to the recipes', required=True)
+	parser.add_argument('--index-path', help='json file caching the recipe index between runs')
 	parser.add_argument('--upload', help='upload recipes to conan', action='store_true')
+	parser.add_argument('--jobs', help='maximum number of recipes built concurrently', type=int, default=4)
+	parser.add_argument('--max-processes', help='maximum number of concurrently running commands', type=int, default=DEFAULT_MAX_PROCESSES)
+	parser.add_argument('--command-timeout', help='timeout in seconds for each conan command', type=float)
+	parser.add_argument('--logs-path', help='directory receiving per recipe and per phase command logs')
+	parser.add_argument('--source-cache-path', help='content addressed source archive cache shared with conan')
+	parser.add_argument('--source-cache-max-size', help='source archive cache size limit in MiB', type=int, default=4096)
+	parser.add_argument('--max-connections', help='maximum number of concurrent http connections', type=int, default=DEFAULT_MAX_CONNECTIONS)
+	parser.add_argument('--download-segments', help='maximum number of byte ranges fetched in parallel per source archive', type=int, default=DEFAULT_DOWNLOAD_SEGMENTS)
+	parser.add_argument('--compiler-launcher', help='compiler cache wrapping every compilation of the recipes, e.g. ccache')
+	parser.add_argument('--compiler-cache-dir', help='compiler cache directory shared by all builds')
+	parser.add_argument('--cmake-generator', help='cmake generator used by the recipes, e.g. Ninja')
+	parser.add_argument('--http-cache-path', help='file storing release lookups for conditional requests across runs')
+	parser.add_argument('--github-api-url', help='github api endpoint', default=GITHUB_API_URL)
+	parser.add_argument('--state-path', help='manifest of recipe fingerprints already built and uploaded, used to skip unchanged builds')
+	parser.add_argument('--history-path', help='json file with recent build durations used to start the longest critical path first')
+	parser.add_argument('--plan', help='print the predicted build schedule and makespan without updating anything', action='store_true')
+	parser.add_argument('--checkpoint-path', help='json file recording the completed steps of the run')
+	parser.add_argument('--resume', help='continue the run recorded in the checkpoint from its first incomplete step', action='store_true')
+	parser.add_argument('--report-path', help='json file receiving per stage timings, peak rss and transferred bytes of the run')
+	parser.add_argument('--remote-url', help='conan remote receiving the packages', default=CONAN_NEMTECH_REMOTE)
+	parser.add_argument(
+		'--skip-published',
+		help='skip building and uploading packages already available on the remote',
+		action=argparse.BooleanOptionalAction,
+		default=True)
+	parser.add_argument(
+		'--discovery',
+		choices=('rest', 'graphql'),
+		help='release lookup backend, graphql queries all repositories at once and requires GITHUB_TOKEN',
+		default='rest')
 	args = parser.parse_args()
 
-	recipe_helper = RecipeHelper(DEPENDENCY_MAP, REPO_RECIPE_MAP)
-	recipes_updater = CatapultRecipesUpdater(args.recipes_path, recipe_helper)
-	recipes_to_update = await recipes_updater.get_available_updates(args.recipes)
-	if not recipes_to_update:
-		print('no recipe to update')
-		return
+	if args.resume and not args.checkpoint_path:
+		parser.error('--resume requires --checkpoint-path')
+
+	set_max_processes(args.max_processes)
+	registry = RecipeRegistry(args.recipes_path, args.index_path)
+	unknown_recipes = set(args.recipes or []) - set(registry.recipes)
+	if unknown_recipes:
+		parser.error(f'unknown recipes {", ".join(sorted(unknown_recipes))}, available recipes are {", ".join(registry.recipes)}')
+
+	source_cache = SourceArchiveCache(args.source_cache_path, args.source_cache_max_size * 1024 * 1024) if args.source_cache_path else None
+	build_state = BuildStateManifest(args.state_path) if args.state_path else None
+	conan_conf = [source_cache.conan_conf] if source_cache else []
+	if args.compiler_launcher:
+		conan_conf.append(f'user.catapult:compiler_launcher={args.compiler_launcher}')
+	if args.compiler_cache_dir:
+		conan_conf.append(f'user.catapult:compiler_cache_dir={Path(args.compiler_cache_dir).absolute()}')
+	if args.cmake_generator:
+		conan_conf.extend(f'{recipe}/*:tools.cmake.cmaketoolchain:generator={args.cmake_generator}' for recipe in CMAKE_GENERATOR_RECIPES)
+
+	github_token = os.environ.get('GITHUB_TOKEN')
+	api_headers = {'Authorization': f'bearer {github_token}'} if github_token else {}
+	report = RunReport()
+	# a plan only run leaves the checkpoint of an interrupted run untouched
+	checkpoint = RunCheckpoint(args.checkpoint_path, args.resume) if args.checkpoint_path and not args.plan else None
+	try:
+		async with HttpClient(args.http_cache_path, args.max_connections, api_headers=api_headers, report=report) as http_client:
+			recipes_updater = CatapultRecipesUpdater(
+				args.recipes_path,
+				registry,
+				http_client,
+				max_jobs=args.jobs,
+				command_timeout=args.command_timeout,
+				logs_path=args.logs_path,
+				source_cache=source_cache,
+				github_api_url=args.github_api_url,
+				discovery=args.discovery,
+				build_state=build_state,
+				skip_published=args.skip_published,
+				report=report,
+				build_history=BuildHistory(args.history_path),
+				checkpoint=checkpoint,
+				download_manager=DownloadManager(http_client, args.download_segments),
+				conan_conf=conan_conf)
+			if checkpoint and checkpoint.discovery is not None:
+				# the recipe files may already be rewritten, so the updates can not be discovered again
+				recipes_to_update = checkpoint.discovery
+				print(f'resuming run from {checkpoint.filepath}')
+			else:
+				recipes_to_update = await recipes_updater.get_available_updates(args.recipes or registry.recipes)
+				if checkpoint:
+					checkpoint.record_discovery(recipes_to_update)
+
+			if not recipes_to_update:
+				print('no recipe to update')
+				if checkpoint:
+					checkpoint.finish()
+
+				return
 
-	print(f'recipes to update - {recipes_to_update}')
-	await recipes_updater.update_recipes_version(recipes_to_update)
-	update_message = '\n'.join([f'{recipe} {versions[0]} -> {versions[1]}' for recipe, versions in recipes_to_update.items()])
+			print(f'recipes to update - {recipes_to_update}')
+			if args.plan:
+				recipes_updater.print_build_plan(recipes_to_update)
+				return
 
-	# commit recipe updates before doing the build.
-	if args.commit_title:
-		dispatch_subprocess(['git', 'add', '.'])
-		dispatch_subprocess(['git', 'commit', '-m', f'{args.commit_title}\n\n{update_message}'])
+			update_message = '\n'.join([f'{recipe} {versions[0]} -> {versions[1]}' for recipe, versions in recipes_to_update.items()])
 
-	initialize_conan()
-	await recipes_updater.build_conan_package(recipes_to_update)
+			await initialize_conan(args.remote_url)
 
-	if args.upload:
-		await recipes_updater.upload_conan_package(recipes_to_update)
+			# recipe updates are committed as soon as all files are rewritten, while the builds are running
+			commit_message = f'{args.commit_title}\n\n{update_message}' if args.commit_title else None
+			await recipes_updater.process_updates(recipes_to_update, args.upload, commit_message)
+			if checkpoint:
+				checkpoint.finish()
 
-	print(f'updated recipe:\n{update_message}')
+		print(f'updated recipe:\n{update_message}')
+	finally:
+		# the report is also written for failed runs, it shows where the time went before the failure
+		if args.report_path:
+			report.write(args.report_path)
 
 
 if '__main__' == __name__:
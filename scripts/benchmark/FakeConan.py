@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+
+# stands in for the conan executable, simulating build and upload latency without compiling anything
+
+import json
+import os
+import sys
+import time
+
+
+def get_option(arguments, name):
+	prefix = f'--{name}='
+	return next((argument[len(prefix):] for argument in arguments if argument.startswith(prefix)), None)
+
+
+def simulate_create(arguments, durations):
+	recipe = get_option(arguments, 'name')
+	version = get_option(arguments, 'version')
+	reference = f'{recipe}/{version}@nemtech/stable'
+	duration = durations.get(recipe, 0)
+
+	# same phase markers as conan, so the updater report splits the create time
+	for marker, share in ((f'Calling source() in {os.getcwd()}', 0.1), ('Running CMake.configure()', 0.1), ('Running CMake.build()', 0.7), ('Calling package()', 0.1)):
+		print(f'{reference}: {marker}', flush=True)
+		time.sleep(duration * share)
+
+	print(f"{reference}: Package '{'0' * 40}' created", flush=True)
+
+
+def main():
+	arguments = sys.argv[1:]
+	durations_filepath = os.environ.get('FAKE_CONAN_DURATIONS')
+	durations = {}
+	if durations_filepath:
+		with open(durations_filepath, 'rt', encoding='utf-8') as durations_file:
+			durations = json.load(durations_file)
+
+	command = arguments[0] if arguments else ''
+	if 'create' == command:
+		simulate_create(arguments, durations)
+	elif 'upload' == command:
+		time.sleep(float(os.environ.get('FAKE_CONAN_UPLOAD_SECONDS', '0')))
+		print(f'Uploading {arguments[1]}')
+	elif 'list' == command:
+		print(json.dumps({'nemtech': {}}))
+	elif 'graph' == command:
+		print(json.dumps({'graph': {'nodes': {}}}))
+	elif 'profile' == command and 'show' in arguments:
+		print('[settings]\nos=Linux\narch=x86_64')
+
+
+if '__main__' == __name__:
+	main()
@@ -0,0 +1,127 @@
+import asyncio
+import hashlib
+import re
+
+from aiohttp import web
+
+ARCHIVE_CHUNK_SIZE = 256 * 1024
+GRAPHQL_REPOSITORY_PATTERN = re.compile(r'(\w+): repository\(owner: "([^"]+)", name: "([^"]+)"\)')
+
+
+class GithubStandIn:
+	# serves the subset of the github api and archive downloads used by the updater
+	def __init__(self, latest_versions, archive_size, latency=0, accept_ranges=True, drop_after=None):
+		self.latest_versions = latest_versions
+		self.archive_size = archive_size
+		self.latency = latency
+		self.accept_ranges = accept_ranges
+		# simulates flaky connections, the first response of every archive is cut after this many bytes
+		self.drop_after = drop_after
+		self.dropped_archives = set()
+		self.request_count = 0
+		self.runner = None
+		self.base_url = None
+
+	async def __aenter__(self):
+		app = web.Application()
+		app.router.add_get('/repos/{owner}/{repo}/releases/latest', self._get_latest_release)
+		app.router.add_post('/graphql', self._post_graphql)
+		app.router.add_get('/{owner}/{repo}/archive/{version}.tar.gz', self._get_archive)
+		self.runner = web.AppRunner(app)
+		await self.runner.setup()
+		site = web.TCPSite(self.runner, '127.0.0.1', 0)
+		await site.start()
+		port = self.runner.addresses[0][1]
+		self.base_url = f'http://127.0.0.1:{port}'
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.runner.cleanup()
+
+	async def _simulate_latency(self):
+		self.request_count += 1
+		if self.latency:
+			await asyncio.sleep(self.latency)
+
+	async def _get_latest_release(self, request):
+		await self._simulate_latency()
+		repo = request.match_info['repo']
+		etag = f'"{repo}-{self.latest_versions[repo]}"'
+		if request.headers.get('If-None-Match') == etag:
+			return web.Response(status=304, headers={'ETag': etag})
+
+		return web.json_response({'tag_name': f'v{self.latest_versions[repo]}'}, headers={'ETag': etag})
+
+	async def _post_graphql(self, request):
+		await self._simulate_latency()
+		query = (await request.json())['query']
+		data = {}
+		for alias, _, repo in GRAPHQL_REPOSITORY_PATTERN.findall(query):
+			data[alias] = {'latestRelease': {'tagName': f'v{self.latest_versions[repo]}'}} if repo in self.latest_versions else None
+
+		return web.json_response({'data': data})
+
+	def get_archive_url(self, owner, repo, version):
+		# same layout as github archive urls, so the recipe registry derives the repository from it
+		return f'{self.base_url}/{owner}/{repo}/archive/{version}.tar.gz'
+
+	@staticmethod
+	def _get_archive_chunk(repo, version, index):
+		# deterministic content, so every download of an archive hashes to the same value
+		seed = hashlib.sha256(f'{repo}/{version}/{index}'.encode('utf-8')).digest()
+		return seed * (ARCHIVE_CHUNK_SIZE // len(seed))
+
+	def get_archive_bytes(self, repo, version, start, end):
+		parts = []
+		for index in range(start // ARCHIVE_CHUNK_SIZE, (end - 1) // ARCHIVE_CHUNK_SIZE + 1):
+			chunk_start = index * ARCHIVE_CHUNK_SIZE
+			chunk = self._get_archive_chunk(repo, version, index)
+			parts.append(chunk[max(start - chunk_start, 0):end - chunk_start])
+
+		return b''.join(parts)
+
+	def _parse_range(self, request):
+		match = re.fullmatch(r'bytes=(\d+)-(\d*)', request.headers.get('Range', ''))
+		if not self.accept_ranges or not match:
+			return 0, self.archive_size
+
+		return int(match.group(1)), int(match.group(2)) + 1 if match.group(2) else self.archive_size
+
+	async def _get_archive(self, request):
+		await self._simulate_latency()
+		repo = request.match_info['repo']
+		version = request.match_info['version']
+		headers = {'Content-Type': 'application/gzip', 'ETag': f'"{repo}-{version}"'}
+		if self.accept_ranges:
+			headers['Accept-Ranges'] = 'bytes'
+
+		if 'HEAD' == request.method:
+			return web.Response(headers={**headers, 'Content-Length': str(self.archive_size)})
+
+		start, end = self._parse_range(request)
+		is_range = 'Range' in request.headers and self.accept_ranges
+		if is_range:
+			headers['Content-Range'] = f'bytes {start}-{end - 1}/{self.archive_size}'
+
+		response = web.StreamResponse(status=206 if is_range else 200, headers=headers)
+		response.content_length = end - start
+		await response.prepare(request)
+
+		drop_at = None
+		if self.drop_after is not None and (repo, version) not in self.dropped_archives:
+			self.dropped_archives.add((repo, version))
+			drop_at = start + self.drop_after
+
+		position = start
+		while position < end:
+			chunk_end = min(end, position + ARCHIVE_CHUNK_SIZE - position % ARCHIVE_CHUNK_SIZE)
+			if drop_at is not None and chunk_end > drop_at:
+				await response.write(self.get_archive_bytes(repo, version, position, drop_at))
+				request.transport.close()
+				return response
+
+			await response.write(self.get_archive_bytes(repo, version, position, chunk_end))
+			position = chunk_end
+
+		await response.write_eof()
+		return response
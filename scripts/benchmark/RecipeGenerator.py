@@ -0,0 +1,78 @@
+import random
+
+SYNTHETIC_OWNER = 'synthetic'
+CURRENT_VERSION = '1.0.0'
+LATEST_VERSION = '1.1.0'
+
+CONFIG_TEMPLATE = '''versions:
+  "{version}":
+    folder: all
+'''
+
+CONANDATA_TEMPLATE = '''sources:
+  "{version}":
+    url: "{url}"
+    sha256: "{sha256}"
+'''
+
+CONANFILE_TEMPLATE = '''from conan import ConanFile
+from conan.tools.cmake import CMake, cmake_layout
+
+
+class SyntheticConan(ConanFile):
+	name = "{name}"
+	settings = "os", "arch", "compiler", "build_type"
+	generators = "CMakeToolchain", "CMakeDeps"
+
+	def requirements(self):
+{requirements}
+
+	def layout(self):
+		cmake_layout(self, src_folder="src")
+
+	def build(self):
+		cmake = CMake(self)
+		cmake.configure()
+		cmake.build()
+'''
+
+TEST_PACKAGE_CMAKELISTS_TEMPLATE = '''cmake_minimum_required(VERSION 3.8)
+project(test_package LANGUAGES CXX)
+
+find_package({name} {version} REQUIRED CONFIG)
+'''
+
+
+def get_recipe_name(index):
+	return f'synthetic-{index:04}'
+
+
+def _write_recipe(recipes_path, name, dependencies, archive_url):
+	recipe_path = recipes_path / name
+	(recipe_path / 'all/test_package').mkdir(parents=True)
+	(recipe_path / 'config.yml').write_text(CONFIG_TEMPLATE.format(version=CURRENT_VERSION))
+	(recipe_path / 'all/conandata.yml').write_text(CONANDATA_TEMPLATE.format(
+		version=CURRENT_VERSION,
+		url=archive_url,
+		sha256='0' * 64))
+
+	requirements = [f'\t\tself.requires("{dependency}/{CURRENT_VERSION}@nemtech/stable")' for dependency in dependencies]
+	(recipe_path / 'all/conanfile.py').write_text(CONANFILE_TEMPLATE.format(
+		name=name,
+		requirements='\n'.join(requirements) if requirements else '\t\tpass'))
+	(recipe_path / 'all/test_package/CMakeLists.txt').write_text(TEST_PACKAGE_CMAKELISTS_TEMPLATE.format(name=name, version=CURRENT_VERSION))
+
+
+def generate_recipes(recipes_path, recipe_count, get_archive_url, seed=0, max_dependencies=3):
+	# recipes only depend on recipes generated before them, so the dependency graph is always acyclic
+	# returns the latest release of every generated repository
+	generator = random.Random(seed)
+	latest_versions = {}
+	for index in range(recipe_count):
+		name = get_recipe_name(index)
+		dependency_count = min(index, generator.randint(0, max_dependencies))
+		dependencies = sorted(get_recipe_name(dependency) for dependency in generator.sample(range(index), dependency_count))
+		_write_recipe(recipes_path, name, dependencies, get_archive_url(SYNTHETIC_OWNER, name, CURRENT_VERSION))
+		latest_versions[name] = LATEST_VERSION
+
+	return latest_versions
@@ -0,0 +1,243 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import stat
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+
+from GithubStandIn import GithubStandIn
+from RecipeGenerator import LATEST_VERSION, SYNTHETIC_OWNER, generate_recipes
+
+sys.path.insert(0, str(Path(__file__).absolute().parent.parent))
+
+import CatapultRecipeUpdater as updater
+
+FAKE_CONAN_FILEPATH = Path(__file__).absolute().parent / 'FakeConan.py'
+
+
+@contextmanager
+def fake_conan_on_path(bin_path, durations_filepath, upload_seconds):
+	conan_filepath = bin_path / 'conan'
+	conan_filepath.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CONAN_FILEPATH}" "$@"\n')
+	conan_filepath.chmod(conan_filepath.stat().st_mode | stat.S_IXUSR)
+
+	original_environ = os.environ.copy()
+	os.environ['PATH'] = f'{bin_path}{os.pathsep}{os.environ["PATH"]}'
+	os.environ['FAKE_CONAN_DURATIONS'] = str(durations_filepath)
+	os.environ['FAKE_CONAN_UPLOAD_SECONDS'] = str(upload_seconds)
+	try:
+		yield
+	finally:
+		os.environ.clear()
+		os.environ.update(original_environ)
+
+
+@contextmanager
+def quiet_output(verbose):
+	if verbose:
+		yield
+		return
+
+	with redirect_stdout(io.StringIO()):
+		yield
+
+
+class UpdaterBenchmark:
+	def __init__(self, args, work_path):
+		self.args = args
+		self.work_path = work_path
+
+	def _create_updater(self, recipes_path, registry, http_client, standin, **kwargs):
+		return updater.CatapultRecipesUpdater(
+			recipes_path,
+			registry,
+			http_client,
+			max_jobs=self.args.jobs,
+			github_api_url=standin.base_url,
+			download_manager=updater.DownloadManager(http_client, self.args.download_segments),
+			**kwargs)
+
+	async def _measure_discovery(self, recipes_path, registry, standin, discovery):
+		standin.request_count = 0
+		async with updater.HttpClient() as http_client:
+			recipes_updater = self._create_updater(recipes_path, registry, http_client, standin, discovery=discovery)
+			start_counter = time.perf_counter()
+			recipes_versions = await recipes_updater.get_available_updates(registry.recipes)
+			duration = time.perf_counter() - start_counter
+
+		return recipes_versions, {'seconds': round(duration, 3), 'requests': standin.request_count}
+
+	async def _measure_hashing(self, recipes_path, registry, standin):
+		async with updater.HttpClient() as http_client:
+			recipes_updater = self._create_updater(recipes_path, registry, http_client, standin)
+			start_counter = time.perf_counter()
+			await updater.gather_or_cancel(*[
+				recipes_updater._download_sha256(standin.get_archive_url(SYNTHETIC_OWNER, recipe, LATEST_VERSION), recipe)
+				for recipe in registry.recipes
+			])
+			duration = time.perf_counter() - start_counter
+
+		total_size = self.args.archive_size * 1024 * len(registry.recipes)
+		return {'seconds': round(duration, 3), 'mib_per_second': round(total_size / duration / (1024 * 1024), 1)}
+
+	@staticmethod
+	def _measure_index(recipes_path, index_filepath):
+		# a cold scan parses every recipe, a warm scan only compares file signatures against the cached index
+		start_counter = time.perf_counter()
+		updater.RecipeRegistry(recipes_path, index_filepath)
+		cold_duration = time.perf_counter() - start_counter
+
+		start_counter = time.perf_counter()
+		updater.RecipeRegistry(recipes_path, index_filepath)
+		warm_duration = time.perf_counter() - start_counter
+		return {'cold_seconds': round(cold_duration, 3), 'warm_seconds': round(warm_duration, 3)}
+
+	@staticmethod
+	def _measure_rewrite(recipes_path, registry, recipes_versions):
+		# only the file rewriting, the archives are hashed by the hashing stage
+		start_counter = time.perf_counter()
+		rewritten_filepaths = []
+		for recipe, (current_version, new_version) in recipes_versions.items():
+			rewriter = updater.RecipeFileRewriter()
+			for recipe_filepath in (
+				recipes_path / f'{recipe}/config.yml',
+				recipes_path / f'{recipe}/all/conandata.yml',
+				recipes_path / f'{recipe}/all/test_package/CMakeLists.txt'
+			):
+				rewriter.update_version(recipe_filepath, current_version, new_version)
+
+			rewriter.update_source_sha256(recipes_path / f'{recipe}/all/conandata.yml', new_version, '1' * 64)
+			registry.update_recipe_dependent_version({recipe: (current_version, new_version)}, rewriter)
+			rewritten_filepaths += rewriter.apply()
+
+		duration = time.perf_counter() - start_counter
+		return {'seconds': round(duration, 3), 'files': len(rewritten_filepaths), 'files_per_second': round(len(rewritten_filepaths) / duration)}
+
+	async def _measure_pipeline(self, recipes_path, registry, standin, recipes_versions, durations):
+		build_history = updater.BuildHistory(None)
+		for recipe, duration in durations.items():
+			build_history.record(recipe, duration)
+
+		async with updater.HttpClient() as http_client:
+			recipes_updater = self._create_updater(recipes_path, registry, http_client, standin, build_history=build_history)
+			scheduler = recipes_updater._create_scheduler(recipes_versions)
+			planned_makespan = scheduler.plan(recipes_versions.keys())[0]
+			critical_path = updater.BuildScheduler(scheduler.dependency_graph, len(recipes_versions), durations).plan(recipes_versions.keys())[0]
+
+			start_counter = time.perf_counter()
+			await recipes_updater.process_updates(recipes_versions, upload=True)
+			duration = time.perf_counter() - start_counter
+
+		# no schedule can beat the longest dependency chain nor the total build time spread over every job
+		lower_bound = max(critical_path, sum(durations.values()) / self.args.jobs)
+		return {
+			'seconds': round(duration, 3),
+			'planned_seconds': round(planned_makespan, 3),
+			'lower_bound_seconds': round(lower_bound, 3),
+			'efficiency': round(lower_bound / duration, 3)
+		}
+
+	async def run(self, recipe_count):
+		run_path = self.work_path / f'{recipe_count}'
+		recipes_path = run_path / 'recipes'
+		recipes_path.mkdir(parents=True)
+
+		latest_versions = {}
+		async with GithubStandIn(
+			latest_versions,
+			self.args.archive_size * 1024,
+			self.args.latency / 1000,
+			accept_ranges=self.args.accept_ranges,
+			drop_after=self.args.drop_after * 1024 if self.args.drop_after else None
+		) as standin:
+			latest_versions.update(generate_recipes(recipes_path, recipe_count, standin.get_archive_url, seed=self.args.seed))
+			pipeline_recipes_path = run_path / 'pipeline'
+			shutil.copytree(recipes_path, pipeline_recipes_path)
+
+			index = self._measure_index(recipes_path, run_path / 'index.json')
+			registry = updater.RecipeRegistry(recipes_path)
+			pipeline_registry = updater.RecipeRegistry(pipeline_recipes_path)
+
+			generator = random.Random(self.args.seed)
+			durations = {recipe: generator.uniform(*self.args.build_seconds) for recipe in registry.recipes}
+			durations_filepath = run_path / 'durations.json'
+			durations_filepath.write_text(json.dumps(durations))
+
+			bin_path = run_path / 'bin'
+			bin_path.mkdir()
+
+			with quiet_output(self.args.verbose):
+				recipes_versions, rest_discovery = await self._measure_discovery(recipes_path, registry, standin, 'rest')
+				_, graphql_discovery = await self._measure_discovery(recipes_path, registry, standin, 'graphql')
+				hashing = await self._measure_hashing(recipes_path, registry, standin)
+				rewrite = self._measure_rewrite(recipes_path, registry, recipes_versions)
+				with fake_conan_on_path(bin_path, durations_filepath, self.args.upload_seconds):
+					pipeline = await self._measure_pipeline(pipeline_recipes_path, pipeline_registry, standin, recipes_versions, durations)
+
+		return {
+			'recipes': recipe_count,
+			'index': index,
+			'discovery_rest': rest_discovery,
+			'discovery_graphql': graphql_discovery,
+			'hashing': hashing,
+			'rewrite': rewrite,
+			'pipeline': pipeline
+		}
+
+
+def print_results(results):
+	print(f'{"recipes":>8} {"index s":>8} {"rest s":>8} {"graphql s":>10} {"hash MiB/s":>11} {"rewrite s":>10} {"pipeline s":>11} {"planned s":>10} {"bound s":>8} {"eff":>6}')
+	for result in results:
+		pipeline = result['pipeline']
+		print(' '.join([
+			f'{result["recipes"]:>8}',
+			f'{result["index"]["cold_seconds"]:>8}',
+			f'{result["discovery_rest"]["seconds"]:>8}',
+			f'{result["discovery_graphql"]["seconds"]:>10}',
+			f'{result["hashing"]["mib_per_second"]:>11}',
+			f'{result["rewrite"]["seconds"]:>10}',
+			f'{pipeline["seconds"]:>11}',
+			f'{pipeline["planned_seconds"]:>10}',
+			f'{pipeline["lower_bound_seconds"]:>8}',
+			f'{pipeline["efficiency"]:>6}'
+		]))
+
+
+async def main():
+	parser = argparse.ArgumentParser(description='benchmarks the recipe updater against local github and conan stand-ins')
+	parser.add_argument('--recipe-counts', help='number of synthetic recipes per run', type=int, nargs='+', default=[50, 100, 200, 400])
+	parser.add_argument('--jobs', help='number of concurrent builds', type=int, default=4)
+	parser.add_argument('--archive-size', help='size of each source archive in KiB', type=int, default=1024)
+	parser.add_argument('--download-segments', help='byte ranges fetched in parallel per archive', type=int, default=updater.DEFAULT_DOWNLOAD_SEGMENTS)
+	parser.add_argument('--accept-ranges', help='serve archives with byte range support', action=argparse.BooleanOptionalAction, default=True)
+	parser.add_argument('--drop-after', help='cut the first response of every archive after this many KiB', type=int)
+	parser.add_argument('--latency', help='latency of every github request in milliseconds', type=float, default=5)
+	parser.add_argument('--build-seconds', help='range of simulated build durations', type=float, nargs=2, default=[0.05, 0.2])
+	parser.add_argument('--upload-seconds', help='simulated upload duration', type=float, default=0.01)
+	parser.add_argument('--seed', help='seed of the synthetic recipes and build durations', type=int, default=0)
+	parser.add_argument('--output', help='write the results to this json file')
+	parser.add_argument('--verbose', help='show the updater output', action='store_true')
+	args = parser.parse_args()
+
+	updater.set_max_processes(args.jobs * 2)
+	results = []
+	with tempfile.TemporaryDirectory() as work_path:
+		benchmark = UpdaterBenchmark(args, Path(work_path))
+		for recipe_count in args.recipe_counts:
+			results.append(await benchmark.run(recipe_count))
+			print(f'finished benchmark with {recipe_count} recipes', file=sys.stderr)
+
+	print_results(results)
+	if args.output:
+		updater.write_json_file(Path(args.output), results)
+
+
+if '__main__' == __name__:
+	asyncio.run(main())